@@ -1,7 +1,7 @@
 from app import app, db
-from app.models import User, Post
+from app.models import User, Course
 
 
 @app.shell_context_processor
 def make_shell_context():
-    return {'db': db, 'User': User, 'Course': Post}
\ No newline at end of file
+    return {'db': db, 'User': User, 'Course': Course}
@@ -1,16 +1,24 @@
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from config import Config
 from flask_login import LoginManager
 from flask_bootstrap import Bootstrap
+from app.weather import Weather
+from app.perf import Perf
+from app.passwords import Passwords
+from app.pool import configure_engine
+from app.replica import RoutingSQLAlchemy
 
 app = Flask(__name__)
 app.config.from_object(Config)
-db = SQLAlchemy(app)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = configure_engine(app.config)
+db = RoutingSQLAlchemy(app)
 migrate = Migrate(app, db)
 login = LoginManager(app)
 login.login_view = 'login'
 bootstrap = Bootstrap(app)
+weather = Weather(app)
+perf = Perf(app)
+passwords = Passwords(app)
 
-from app import routes, models
\ No newline at end of file
+from app import routes, models, api, cli
\ No newline at end of file
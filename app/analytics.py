@@ -0,0 +1,325 @@
+import threading
+import warnings
+from collections import OrderedDict
+from itertools import chain
+import numpy as np
+from app import app, db
+from app.models import Round, Roundscore
+
+# Contains hole difficulty analytics. Scores of a course are read from the DBAPI cursor into a (rounds x holes) NumPy
+# array, and statistics of every hole are calculated from the array without Python loops over scores. The array of a
+# course is cached and updated with the rounds that changed, so a new score does not read every score of the course.
+
+# Percentiles that are calculated for every hole
+PERCENTILES = (25, 50, 75, 90)
+
+
+class ScoreMatrix(object):
+    """
+    Scores of rounds played on one course. scores is (rounds x holes) float array with NaN for missing scores,
+    obs is boolean array of the same shape and users has user id of every round.
+    """
+    __slots__ = ('courseid', 'holenums', 'pars', 'roundids', 'users', 'scores', 'obs')
+
+    def __init__(self, courseid, holenums, pars, roundids, users, scores, obs):
+        self.courseid = courseid
+        self.holenums = holenums
+        self.pars = pars
+        self.roundids = roundids
+        self.users = users
+        self.scores = scores
+        self.obs = obs
+
+    def __repr__(self):
+        """
+        ___repr__ method tells python how to print objects of ScoreMatrix
+        """
+        return '<ScoreMatrix {} {}x{}>'.format(self.courseid, len(self.roundids), len(self.holenums))
+
+    def __len__(self):
+        return len(self.roundids)
+
+    def for_user(self, userid):
+        """
+        for_user returns ScoreMatrix of rounds of one user
+        """
+        mask = self.users == userid
+        return ScoreMatrix(self.courseid, self.holenums, self.pars, self.roundids[mask], self.users[mask],
+                           self.scores[mask], self.obs[mask])
+
+
+class HoleAnalytics(object):
+    """
+    Difficulty of one hole of a course. Rates are shares of scores of the hole, bogey rate includes worse scores and
+    birdie rate better scores. Values are None when the hole has no scores.
+    """
+    __slots__ = ('holenum', 'holepar', 'count', 'mean', 'std', 'percentiles', 'birdierate', 'parrate', 'bogeyrate',
+                 'obrate', 'strokesgained')
+
+    def __init__(self, holenum, holepar, count, mean, std, percentiles, birdierate, parrate, bogeyrate, obrate, strokesgained):
+        self.holenum = holenum
+        self.holepar = holepar
+        self.count = count
+        self.mean = mean
+        self.std = std
+        self.percentiles = percentiles
+        self.birdierate = birdierate
+        self.parrate = parrate
+        self.bogeyrate = bogeyrate
+        self.obrate = obrate
+        self.strokesgained = strokesgained
+
+    def __repr__(self):
+        """
+        ___repr__ method tells python how to print objects of HoleAnalytics
+        """
+        return '<HoleAnalytics {}>'.format(self.holenum)
+
+
+class CourseAnalytics(object):
+    """
+    Hole difficulty of every hole of a course for one user, or for all users when userid is None.
+    Strokes gained are compared to baseline, which is mean of all users for one user and par for all users.
+    """
+    __slots__ = ('courseid', 'userid', 'holes', 'roundcount', 'strokesgained')
+
+    def __init__(self, courseid, userid, holes, roundcount, strokesgained):
+        self.courseid = courseid
+        self.userid = userid
+        self.holes = holes
+        self.roundcount = roundcount
+        self.strokesgained = strokesgained
+
+    def __repr__(self):
+        """
+        ___repr__ method tells python how to print objects of CourseAnalytics
+        """
+        return '<CourseAnalytics {} {}>'.format(self.courseid, self.userid)
+
+
+class MatrixCache(object):
+    """
+    In-process LRU cache of score matrices by course. Matrix of a course keeps every round with its version, so that
+    only rounds that were created, changed or deleted since are read again when the matrix is used next time.
+    """
+
+    def __init__(self, maxentries=8):
+        self.maxentries = maxentries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, courseid):
+        """
+        get returns cached (versions, matrix) of course or None
+        """
+        with self._lock:
+            entry = self._entries.get(courseid)
+            if entry is not None:
+                self._entries.move_to_end(courseid)
+            return entry
+
+    def set(self, courseid, versions, matrix):
+        """
+        set stores matrix of course and removes least recently used matrices when cache is full
+        """
+        with self._lock:
+            self._entries.pop(courseid, None)
+            self._entries[courseid] = (versions, matrix)
+            while len(self._entries) > self.maxentries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        clear empties the cache
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+matrix_cache = MatrixCache(app.config.get('ANALYTICS_CACHE_COURSES', 8))
+
+
+def _fetcharray(query, columns):
+    """
+    _fetcharray runs query and reads its integer columns from the DBAPI cursor straight into (rows x columns) array,
+    without creating a result row object for every row
+    """
+    result = db.session.execute(query)
+    try:
+        data = np.fromiter(chain.from_iterable(result.cursor), dtype=np.int64)
+    finally:
+        result.close()
+    return data.reshape(-1, columns)
+
+
+def _scorequery(condition):
+    """
+    _scorequery returns query of scores that match condition with round id, hole, score and ob packed to one integer,
+    ((round id * 256 + hole) * 65536 + score) * 2 + ob. Reading one column instead of four makes the DBAPI create a
+    quarter of the Python objects. Holes and scores that do not fit their bits are left out.
+    """
+    ob = db.case([(Roundscore.ob == True, 1)], else_=0)
+    packed = ((db.cast(Roundscore.round_id, db.BigInteger) * 256 + Roundscore.hole) * 65536 + Roundscore.score) * 2 + ob
+    return db.select([packed]) \
+        .where(db.and_(condition, Roundscore.hole.between(1, 255), Roundscore.score.between(0, 65535)))
+
+
+def _unpack(packed):
+    """
+    _unpack returns (rows x 4) array of round id, hole, score and ob from integers of _scorequery
+    """
+    packed = packed.reshape(-1)
+    return np.stack([packed >> 25, (packed >> 17) & 0xFF, (packed >> 1) & 0xFFFF, packed & 1], axis=1)
+
+
+def _fill(scores, obs, roundids, holenums, data):
+    """
+    _fill writes (round id, hole, score, ob) rows of data to scores and obs. Rows of unknown rounds and holes are left out.
+    """
+    if not len(data) or not len(roundids) or not len(holenums):
+        return
+    roundindex = np.minimum(np.searchsorted(roundids, data[:, 0]), len(roundids) - 1)
+    holeindex = np.minimum(np.searchsorted(holenums, data[:, 1]), len(holenums) - 1)
+    valid = (roundids[roundindex] == data[:, 0]) & (holenums[holeindex] == data[:, 1])
+    scores[roundindex[valid], holeindex[valid]] = data[valid, 2]
+    obs[roundindex[valid], holeindex[valid]] = data[valid, 3] > 0
+
+
+def load_scorematrix(courseid, chunksize=500):
+    """
+    load_scorematrix returns every score of a course as ScoreMatrix. Scores of holes that the course does not have
+    (anymore) and rounds without scores are left out.
+    Round ids and versions are read on every call. When the course is in matrix_cache, scores are read only for rounds
+    that are new or have a new version, in chunks of chunksize rounds, and other rows are copied from the cached matrix.
+    """
+    from app.layout import get_layout
+
+    layout = get_layout(courseid)
+    holenums = np.array([holenum for holenum, holepar, holelength in layout], dtype=np.int64)
+    pars = np.array([holepar or 0 for holenum, holepar, holelength in layout], dtype=np.float64)
+    rounds = _fetcharray(db.select([Round.id, db.func.coalesce(Round.rounduser_id, 0), db.func.coalesce(Round.version, 0)])
+                         .where(Round.roundcourse_id == courseid).order_by(Round.id), 3)
+    roundids = rounds[:, 0]
+    versions = rounds[:, 2]
+    scores = np.full((len(roundids), len(holenums)), np.nan)
+    obs = np.zeros((len(roundids), len(holenums)), dtype=bool)
+
+    cached = matrix_cache.get(courseid)
+    unchanged = np.zeros(len(roundids), dtype=bool)
+    if cached is not None and len(cached[1]) and np.array_equal(cached[1].holenums, holenums):
+        cachedversions, cachedmatrix = cached
+        position = np.minimum(np.searchsorted(cachedmatrix.roundids, roundids), len(cachedmatrix) - 1)
+        unchanged = (cachedmatrix.roundids[position] == roundids) & (cachedversions[position] == versions)
+        scores[unchanged] = cachedmatrix.scores[position[unchanged]]
+        obs[unchanged] = cachedmatrix.obs[position[unchanged]]
+    changed = roundids[~unchanged]
+    if len(changed) > len(roundids) // 2:
+        data = _fetcharray(_scorequery(Round.roundcourse_id == courseid)
+                           .select_from(Roundscore.__table__.join(Round.__table__, Round.id == Roundscore.round_id)), 1)
+        _fill(scores, obs, roundids, holenums, _unpack(data))
+    else:
+        for start in range(0, len(changed), chunksize):
+            chunk = [int(roundid) for roundid in changed[start:start + chunksize]]
+            _fill(scores, obs, roundids, holenums, _unpack(_fetcharray(_scorequery(Roundscore.round_id.in_(chunk)), 1)))
+
+    matrix_cache.set(courseid, versions, ScoreMatrix(courseid, holenums, pars, roundids, rounds[:, 1], scores, obs))
+    played = ~np.isnan(scores).all(axis=1)
+    return ScoreMatrix(courseid, holenums, pars, roundids[played], rounds[played, 1], scores[played], obs[played])
+
+
+def warm_cache():
+    """
+    warm_cache loads score matrices of the courses with most rounds to matrix_cache, as many as the cache keeps.
+    Returns ids of the loaded courses.
+    """
+    courseids = [courseid for courseid, in db.session.query(Round.roundcourse_id)
+                 .filter(Round.roundcourse_id != None)
+                 .group_by(Round.roundcourse_id)
+                 .order_by(db.func.count(Round.id).desc())
+                 .limit(matrix_cache.maxentries)]
+    for courseid in courseids:
+        load_scorematrix(courseid)
+    return courseids
+
+
+def start_warming():
+    """
+    start_warming runs warm_cache in a background thread when ANALYTICS_WARM is set, so that first course analysis
+    pages of a worker process do not read every score of the course. Returns the thread or None.
+    """
+    if not app.config.get('ANALYTICS_WARM', True):
+        return None
+
+    def warm():
+        with app.app_context():
+            try:
+                warm_cache()
+            finally:
+                db.session.remove()
+
+    thread = threading.Thread(target=warm, name='analytics-warm', daemon=True)
+    thread.start()
+    return thread
+
+
+def _value(array, index):
+    """
+    _value converts one value of array to float, or None when it is NaN
+    """
+    value = float(array[index])
+    if np.isnan(value):
+        return None
+    return value
+
+
+def analyze(matrix, userid=None, baseline=None):
+    """
+    analyze calculates CourseAnalytics from ScoreMatrix. baseline is array of expected score of every hole that strokes
+    gained are compared to, par is used when it is None.
+    """
+    scores = matrix.scores
+    played = ~np.isnan(scores)
+    counts = played.sum(axis=0)
+    divisor = np.where(counts > 0, counts, 1)
+    relative = scores - matrix.pars
+    with warnings.catch_warnings():
+        # holes without scores give all-NaN columns
+        warnings.simplefilter('ignore', RuntimeWarning)
+        means = np.nanmean(scores, axis=0)
+        stds = np.nanstd(scores, axis=0)
+        if len(matrix):
+            percentiles = np.nanpercentile(scores, PERCENTILES, axis=0)
+        else:
+            percentiles = np.full((len(PERCENTILES), scores.shape[1]), np.nan)
+    empty = np.where(counts > 0, 1.0, np.nan)
+    birdierates = (relative <= -1).sum(axis=0) / divisor * empty
+    parrates = (relative == 0).sum(axis=0) / divisor * empty
+    bogeyrates = (relative >= 1).sum(axis=0) / divisor * empty
+    obrates = (matrix.obs & played).sum(axis=0) / divisor * empty
+    if baseline is None:
+        baseline = matrix.pars
+    strokesgained = baseline - means
+
+    holes = []
+    for index, holenum in enumerate(matrix.holenums):
+        holes.append(HoleAnalytics(
+            int(holenum), int(matrix.pars[index]), int(counts[index]), _value(means, index), _value(stds, index),
+            [_value(percentiles[number], index) for number in range(len(PERCENTILES))],
+            _value(birdierates, index), _value(parrates, index), _value(bogeyrates, index), _value(obrates, index),
+            _value(strokesgained, index)))
+    total = float(np.nansum(strokesgained)) if counts.any() else None
+    return CourseAnalytics(matrix.courseid, userid, holes, len(matrix), total)
+
+
+def get_courseanalytics(courseid, userid):
+    """
+    get_courseanalytics returns (analytics of user, analytics of all users) of a course from one score matrix. Strokes gained of
+    the user are compared to mean of all users and strokes gained of all users to par.
+    """
+    matrix = load_scorematrix(courseid)
+    field = analyze(matrix)
+    fieldmeans = np.array([np.nan if hole.mean is None else hole.mean for hole in field.holes], dtype=np.float64)
+    return analyze(matrix.for_user(userid), userid, fieldmeans), field
@@ -0,0 +1,150 @@
+from flask import jsonify, request
+from flask_login import current_user, login_required
+from app import app, db
+from app.models import Round, Roundscore, MAX_SCORE
+from app.sync import SyncError, sync_rounds
+from app.rating import update_rating, update_roundratings
+from app.leaderboard import update_leaderboard, update_roundleaderboards
+
+# Contains JSON API for entering scores. A whole batch of hole scores is sent in one request instead of one form page per hole.
+
+
+def round_totals(round):
+    """
+    round_totals returns totals of round as dictionary for JSON responses
+    """
+    return {
+        'round': round.id,
+        'totalscore': round.get_totalscore(),
+        'totalpar': round.totalpar,
+        'totalob': round.totalob,
+        'scorepar': round.get_totalscorepar(),
+    }
+
+
+def get_ownround(roundid):
+    """
+    get_ownround returns round of current user, or None with error response when round does not exist or belongs to someone else
+    """
+    round = Round.query.filter_by(id=roundid).first()
+    if round is None:
+        return None, (jsonify({'errors': ['Round not found']}), 404)
+    if round.rounduser_id != current_user.id:
+        return None, (jsonify({'errors': ['Round belongs to another user']}), 403)
+    return round, None
+
+
+def validate_scores(entries, layout):
+    """
+    validate_scores checks batch of scores against layout of the course. Returns list of (hole, score, ob) tuples and list of errors.
+    """
+    if not isinstance(entries, list) or not entries:
+        return [], ['scores must be a non-empty list']
+    scores = []
+    errors = []
+    seen = set()
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            errors.append('scores[{}] must be an object'.format(index))
+            continue
+        hole = entry.get('hole')
+        score = entry.get('score')
+        ob = entry.get('ob', False)
+        valid = True
+        if not isinstance(hole, int) or isinstance(hole, bool) or layout.get_par(hole) is None:
+            errors.append('scores[{}]: course has no hole {!r}'.format(index, hole))
+            valid = False
+        elif hole in seen:
+            errors.append('scores[{}]: hole {} is given more than once'.format(index, hole))
+            valid = False
+        else:
+            seen.add(hole)
+        if not isinstance(score, int) or isinstance(score, bool) or not 1 <= score <= MAX_SCORE:
+            errors.append('scores[{}]: score must be an integer from 1 to {}'.format(index, MAX_SCORE))
+            valid = False
+        if not isinstance(ob, bool):
+            errors.append('scores[{}]: ob must be true or false'.format(index))
+            valid = False
+        if not valid:
+            continue
+        scores.append((hole, score, ob))
+    return scores, errors
+
+
+def save_scores(round, scores):
+    """
+    save_scores inserts or updates scores of round. Existing scores are loaded with one query and totals of the round are
+    updated in the same transaction. Caller commits.
+    """
+    existing = {}
+    for roundscore in Roundscore.query.filter_by(round_id=round.id):
+        existing[roundscore.hole] = roundscore
+    for hole, score, ob in scores:
+        roundscore = existing.get(hole)
+        if roundscore is None:
+            existing[hole] = round.add_holescore(hole, score, ob)
+        elif roundscore.score != score or roundscore.ob != ob:
+            round.update_holescore(roundscore, score, ob)
+
+
+@app.route('/api/rounds/<int:roundid>', methods=['GET'])
+@login_required
+def api_round(roundid):
+    """
+    API route that returns scores and totals of a round
+    """
+    round, error = get_ownround(roundid)
+    if error is not None:
+        return error
+    result = round_totals(round)
+    result['scores'] = [{'hole': hole.hole, 'score': hole.score, 'ob': bool(hole.ob)} for hole in round.get_scorecard().played()]
+    return jsonify(result)
+
+
+@app.route('/api/rounds/<int:roundid>/scores', methods=['POST'])
+@login_required
+def api_roundscores(roundid):
+    """
+    API route for saving batch of scores of a round. Expects JSON {"scores": [{"hole": 1, "score": 3, "ob": false}, ...]}.
+    Every score is validated before anything is saved, and the batch is saved in one transaction. Returns updated totals.
+    """
+    round, error = get_ownround(roundid)
+    if error is not None:
+        return error
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'errors': ['Request body must be a JSON object']}), 400
+    scores, errors = validate_scores(data.get('scores'), round.course.get_layout())
+    if errors:
+        return jsonify({'errors': errors}), 400
+    save_scores(round, scores)
+    update_rating(round.rounduser_id, round.roundcourse_id)
+    update_leaderboard(round.rounduser_id, round.roundcourse_id)
+    db.session.commit()
+    return jsonify(round_totals(round))
+
+
+@app.route('/api/sync', methods=['POST'])
+@login_required
+def api_sync():
+    """
+    API route for scores entered offline. Expects JSON {"rounds": [{"round": id or "client_id": id, "course": id, "date": iso,
+    "changes": [{"id": id, "hole": 1, "score": 3, "ob": false, "timestamp": iso}, ...]}, ...]}.
+    Rounds with client_id that do not exist yet are created. Sending same batch again is a no-op.
+    Result of every round tells whether the round was created and how many changes were applied.
+    """
+    try:
+        results = sync_rounds(request.get_json(silent=True), current_user.id)
+    except SyncError as error:
+        db.session.rollback()
+        return jsonify({'errors': error.args[0]}), 400
+    # replayed batches change nothing, so ratings and leaderboards are updated only for rounds that changed
+    changed = [round for round, result in results if result['created'] or result['applied']]
+    update_roundratings(changed)
+    update_roundleaderboards(changed)
+    db.session.commit()
+    rounds = []
+    for round, result in results:
+        result.update(round_totals(round))
+        rounds.append(result)
+    return jsonify({'rounds': rounds})
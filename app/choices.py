@@ -0,0 +1,44 @@
+import threading
+import time
+from app import app, db
+from app.models import Course
+
+# Contains process-wide cache of course choices for forms. Only (id, name) tuples are loaded and only when first needed,
+# so importing the app does not touch the database.
+
+
+class CourseChoices(object):
+    """
+    Cached (id, coursename) tuples of all courses. invalidate() bumps the version so the next get() reloads them.
+    Cache also expires after ttl seconds, so that courses created by other worker processes show up.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.version = 0
+        self._loaded = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        get returns list of (id, coursename) tuples ordered by name
+        """
+        loaded = self._loaded
+        if loaded is not None and loaded[0] == self.version and loaded[1] > time.monotonic():
+            return loaded[2]
+        with self._lock:
+            version = self.version
+            choices = db.session.query(Course.id, Course.coursename).order_by(Course.coursename.asc()).all()
+            choices = [(id, coursename) for id, coursename in choices]
+            self._loaded = (version, time.monotonic() + self.ttl, choices)
+        return choices
+
+    def invalidate(self):
+        """
+        invalidate makes next get() load choices from database
+        """
+        with self._lock:
+            self.version = self.version + 1
+
+
+course_choices = CourseChoices(app.config.get('COURSE_CHOICES_TTL', 60))
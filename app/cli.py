@@ -0,0 +1,99 @@
+import click
+from app import app
+from app.models import Course, backfill_roundtotals, delete_rounds
+from app.transfer import import_rounds, export_rounds
+from app.rating import recompute_ratings
+from app.leaderboard import refresh_leaderboards
+
+# Contains flask commands. They are registered here in the package, because FLASK_APP=app.py imports the app package
+# instead of app.py.
+
+
+@app.cli.command('backfill-totals')
+def backfill_totals():
+    """Calculate stored score, par and ob totals for every round."""
+    rounds = backfill_roundtotals()
+    print('Updated totals of {} rounds'.format(rounds))
+
+
+@app.cli.command('delete-rounds')
+@click.option('--before', type=click.DateTime(['%Y-%m-%d']), help='Delete rounds played before this date.')
+@click.option('--course', 'coursename', help='Delete rounds of this course.')
+@click.confirmation_option(prompt='Rounds and their scores will be deleted permanently. Continue?')
+def delete_rounds_command(before, coursename):
+    """Delete rounds played before a date and/or rounds of a course."""
+    if before is None and coursename is None:
+        raise click.UsageError('Give --before and/or --course.')
+    courseid = None
+    if coursename is not None:
+        course = Course.query.filter_by(coursename=coursename).first()
+        if course is None:
+            raise click.BadParameter('course {} not found'.format(coursename), param_hint='--course')
+        courseid = course.id
+    count = delete_rounds(before=before, courseid=courseid)
+    print('Deleted {} rounds'.format(count))
+
+
+@app.cli.command('sync-replica')
+def sync_replica_command():
+    """Copy SQLite database to the SQLite replica, for trying replica routing locally."""
+    import sqlite3
+    primary = app.config['SQLALCHEMY_DATABASE_URI']
+    replica = (app.config.get('SQLALCHEMY_BINDS') or {}).get('replica')
+    if replica is None:
+        raise click.UsageError('Set REPLICA_DATABASE_URL.')
+    if not primary.startswith('sqlite:///') or not replica.startswith('sqlite:///'):
+        raise click.UsageError('Only SQLite databases can be copied, use replication of the database server instead.')
+    source = sqlite3.connect(primary[len('sqlite:///'):])
+    target = sqlite3.connect(replica[len('sqlite:///'):])
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    print('Copied database to replica')
+
+
+@app.cli.command('recompute-ratings')
+@click.option('--batch-size', default=500, show_default=True, help='Users recomputed per statement.')
+def recompute_ratings_command(batch_size):
+    """Recompute ratings of every user from their last rounds."""
+    count = recompute_ratings(batchsize=batch_size)
+    print('Stored {} ratings'.format(count))
+
+
+@app.cli.command('refresh-leaderboards')
+def refresh_leaderboards_command():
+    """Recompute leaderboards of every course. Run daily, because periods move with time."""
+    count = refresh_leaderboards()
+    print('Stored {} leaderboard entries'.format(count))
+
+
+@app.cli.command('import-rounds')
+@click.argument('source', type=click.File('r'))
+@click.option('--format', 'format', type=click.Choice(['csv', 'jsonl']), help='Defaults to file extension.')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rounds written per insert.')
+def import_rounds_command(source, format, chunk_size):
+    """Import rounds from CSV or JSON Lines file, - reads stdin."""
+    format = format or file_format(source.name)
+    result = import_rounds(source, format, chunk_size)
+    for error in result.errors:
+        print(error)
+    print('Imported {} rounds, skipped {} already imported, rejected {}'.format(result.imported, result.skipped, result.rejected))
+
+
+@app.cli.command('export-rounds')
+@click.argument('target', type=click.File('w'))
+@click.option('--format', 'format', type=click.Choice(['csv', 'jsonl']), help='Defaults to file extension.')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rounds read per query.')
+def export_rounds_command(target, format, chunk_size):
+    """Export every round to CSV or JSON Lines file, - writes stdout."""
+    format = format or file_format(target.name)
+    count = export_rounds(target, format, chunk_size)
+    if target.name != '<stdout>':
+        print('Exported {} rounds'.format(count))
+
+
+def file_format(filename):
+    """Returns format of file from its extension, jsonl for stdin and stdout."""
+    return 'csv' if filename.endswith('.csv') else 'jsonl'
@@ -2,6 +2,7 @@ from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, BooleanField, SubmitField, TextAreaField, IntegerField, SelectField
 from wtforms.validators import ValidationError, DataRequired, Optional, Email, EqualTo, Length
 from app.models import User, Course, Hole
+from app.choices import course_choices
 
 # Contains forms that app uses
 
@@ -75,13 +76,12 @@ class EditHoleForm(FlaskForm):
     submit = SubmitField('Submit')
 
 class CreateRoundForm(FlaskForm):
-   courses = Course.query.all()
-   choices = []
-   for c in courses:
-       choices.append(c.coursename)
+    course = SelectField(coerce=int)
+    submit = SubmitField('Submit')
 
-   course = SelectField(choices=choices)
-   submit = SubmitField('Submit')
+    def __init__(self, *args, **kwargs):
+        super(CreateRoundForm, self).__init__(*args, **kwargs)
+        self.course.choices = course_choices.get()
 
 class ScoreForm(FlaskForm):
     score = IntegerField('Score', validators=[DataRequired()])
@@ -0,0 +1,113 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import request, session, make_response, render_template
+from flask_login import current_user
+from app import app
+
+# Contains HTTP caching of read-only pages. Page content is rendered to a fragment that is cached by entity and version,
+# and responses carry ETag and Last-Modified headers so that unchanged pages can be answered with 304.
+
+
+class FragmentCache(object):
+    """
+    In-process LRU cache for rendered fragments. Bounded by number of entries and by total size of fragments in UTF-8 bytes.
+    """
+
+    def __init__(self, maxentries=512, maxbytes=16 * 1024 * 1024):
+        self.maxentries = maxentries
+        self.maxbytes = maxbytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        get returns cached fragment or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses = self.misses + 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits = self.hits + 1
+            return entry[0]
+
+    def set(self, key, fragment):
+        """
+        set stores fragment and removes least recently used fragments when cache is full
+        """
+        size = len(fragment.encode('utf-8'))
+        if size > self.maxbytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size = self.size - old[1]
+            self._entries[key] = (fragment, size)
+            self.size = self.size + size
+            while len(self._entries) > self.maxentries or self.size > self.maxbytes:
+                key, old = self._entries.popitem(last=False)
+                self.size = self.size - old[1]
+
+    def clear(self):
+        """
+        clear empties the cache
+        """
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+fragment_cache = FragmentCache(app.config.get('PAGE_CACHE_ENTRIES', 512), app.config.get('PAGE_CACHE_BYTES', 16 * 1024 * 1024))
+
+
+def latest(*dates):
+    """
+    latest returns the latest of dates that are not None, or None
+    """
+    dates = [date for date in dates if date is not None]
+    if not dates:
+        return None
+    return max(dates)
+
+
+def make_etag(key):
+    """
+    make_etag creates ETag from cache key and the logged in user, because the surrounding page shows the username
+    """
+    identity = (current_user.get_id(), getattr(current_user, 'username', None))
+    return hashlib.sha1(repr((key, identity)).encode('utf-8')).hexdigest()
+
+
+def cached_page(key, modified, fragment_template, page_template, title, fragment_context):
+    """
+    cached_page returns response of a read-only page. key must contain every entity version the page depends on.
+    fragment_context is a function that returns template variables of the fragment, it is called only when the fragment is not cached.
+    Returns 304 when client already has this version, unless there are flashed messages waiting to be shown.
+    Only ETag is used as validator. modified is sent as Last-Modified, but If-Modified-Since is not answered with 304,
+    because latest modification time does not change when a round is deleted and the ETag key has the number of rounds.
+    """
+    etag = make_etag(key)
+    hasflashes = bool(session.get('_flashes'))
+    if not hasflashes and etag in request.if_none_match:
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    fragment = fragment_cache.get(key)
+    if fragment is None:
+        fragment = render_template(fragment_template, **fragment_context())
+        fragment_cache.set(key, fragment)
+    response = make_response(render_template(page_template, title=title, fragment=fragment))
+    response.set_etag(etag)
+    if modified is not None:
+        response.last_modified = modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import OrderedDict
+from app import app
+
+# Contains process-wide cache of logged in users. Flask-Login loads the user of every authenticated request, and with
+# this cache the user is read from the database only once per ttl seconds. Cached users are immutable snapshots, so a
+# request can not change them by accident. Other worker processes see changes to a user after ttl at the latest.
+
+
+class IdentityCache(object):
+    """
+    LRU cache of user snapshots by user id. Entries expire after ttl seconds.
+    """
+
+    def __init__(self, ttl=60, maxentries=1024):
+        self.ttl = ttl
+        self.maxentries = maxentries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, userid):
+        """
+        get returns cached snapshot of user or None when it is not cached or has expired
+        """
+        with self._lock:
+            entry = self._entries.get(userid)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses = self.misses + 1
+                return None
+            self._entries.move_to_end(userid)
+            self.hits = self.hits + 1
+            return entry[1]
+
+    def set(self, userid, identity):
+        """
+        set stores snapshot of user and removes least recently used snapshots when cache is full
+        """
+        with self._lock:
+            self._entries.pop(userid, None)
+            self._entries[userid] = (time.monotonic() + self.ttl, identity)
+            while len(self._entries) > self.maxentries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, userid):
+        """
+        invalidate removes snapshot of user, so that next request loads the user from database
+        """
+        with self._lock:
+            self._entries.pop(userid, None)
+
+    def clear(self):
+        """
+        clear empties the cache
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+identity_cache = IdentityCache(app.config.get('IDENTITY_CACHE_TTL', 60), app.config.get('IDENTITY_CACHE_ENTRIES', 1024))
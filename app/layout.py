@@ -0,0 +1,88 @@
+from flask import g, has_app_context
+from app import db
+from app.models import Hole
+
+# Contains course layout cache. Holes of a course are loaded once per request into a compact holenum -> (par, length) map.
+
+
+class CourseLayout(object):
+    """
+    Pars and lengths of every hole of one course
+    """
+    __slots__ = ('courseid', 'holes', 'coursepar')
+
+    def __init__(self, courseid, rows):
+        self.courseid = courseid
+        self.holes = {}
+        coursepar = 0
+        for holenum, holepar, holelength in rows:
+            self.holes[holenum] = (holepar, holelength)
+            coursepar = coursepar + (holepar or 0)
+        self.coursepar = coursepar
+
+    def __repr__(self):
+        """
+        ___repr__ method tells python how to print objects of CourseLayout
+        """
+        return '<CourseLayout {}>'.format(self.courseid)
+
+    def __len__(self):
+        return len(self.holes)
+
+    def __iter__(self):
+        """
+        Iterates (holenum, par, length) tuples in hole order
+        """
+        for holenum in sorted(self.holes):
+            holepar, holelength = self.holes[holenum]
+            yield holenum, holepar, holelength
+
+    def get_par(self, holenum):
+        """
+        get_par returns par of hole or None if course has no such hole
+        """
+        hole = self.holes.get(holenum)
+        if hole is None:
+            return None
+        return hole[0]
+
+    def get_length(self, holenum):
+        """
+        get_length returns length of hole or None if it is not known
+        """
+        hole = self.holes.get(holenum)
+        if hole is None:
+            return None
+        return hole[1]
+
+
+def load_layout(courseid):
+    """
+    load_layout loads holes of course from database with one query
+    """
+    rows = db.session.query(Hole.holenum, Hole.holepar, Hole.holelength) \
+        .filter(Hole.holecourse_id == courseid) \
+        .all()
+    return CourseLayout(courseid, rows)
+
+
+def get_layout(courseid):
+    """
+    get_layout returns layout of course. Layout is loaded once per request and kept in flask.g.
+    """
+    if not has_app_context():
+        return load_layout(courseid)
+    layouts = g.setdefault('courselayouts', {})
+    layout = layouts.get(courseid)
+    if layout is None:
+        layout = load_layout(courseid)
+        layouts[courseid] = layout
+    return layout
+
+
+def invalidate_layout(courseid):
+    """
+    invalidate_layout removes cached layout of course, so that next get_layout loads it again
+    """
+    if has_app_context():
+        g.setdefault('courselayouts', {}).pop(courseid, None)
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+from app import db
+from app.models import Leaderboard, Round, User
+
+# Contains course leaderboards. Best round, average and improvement of every user on a course are precomputed per
+# period to Leaderboard table, so that a board is read with one indexed query. Scores are total score minus total par.
+# Entry of one user is updated when the user saves a round, refresh_leaderboards recomputes whole courses.
+
+# Periods of leaderboards in days
+PERIODS = (30, 90, 365)
+
+# Leaderboard columns that boards can be ordered by, and whether smaller is better
+BOARDS = {
+    'best': (Leaderboard.best, True),
+    'average': (Leaderboard.average, True),
+    'improved': (Leaderboard.improvement, False),
+}
+
+
+def period_columns(now, days):
+    """
+    period_columns returns round count, best and average in the period, and improvement compared to the period before it.
+    Improvement is positive when average of the period is smaller than average of the previous period of the same length.
+    """
+    difference = Round.totalscore - Round.totalpar
+    start = now - timedelta(days=days)
+    current = Round.rounddate >= start
+    previous = db.and_(Round.rounddate >= start - timedelta(days=days), Round.rounddate < start)
+    average = db.func.avg(db.case([(current, difference)]))
+    return (
+        db.func.count(db.case([(current, Round.id)])),
+        db.func.min(db.case([(current, difference)])),
+        db.cast(average, db.Float),
+        db.cast(db.func.avg(db.case([(previous, difference)])) - average, db.Float),
+    )
+
+
+def update_leaderboard(userid, courseid):
+    """
+    update_leaderboard recomputes entries of user on course for every period with one aggregate query over the user's
+    rounds of the last two longest periods. Entries of periods without rounds are removed. Caller commits.
+    """
+    now = datetime.utcnow()
+    columns = []
+    for days in PERIODS:
+        columns.extend(period_columns(now, days))
+    values = db.session.query(*columns) \
+        .filter(Round.rounduser_id == userid, Round.roundcourse_id == courseid, Round.totalscore != None,
+                Round.rounddate >= now - timedelta(days=2 * max(PERIODS))) \
+        .one()
+    entries = {}
+    for entry in Leaderboard.query.filter_by(user_id=userid, course_id=courseid):
+        entries[entry.period] = entry
+    for index, days in enumerate(PERIODS):
+        roundcount, best, average, improvement = values[4 * index:4 * index + 4]
+        entry = entries.get(days)
+        if not roundcount:
+            if entry is not None:
+                db.session.delete(entry)
+            continue
+        if entry is None:
+            entry = Leaderboard(user_id=userid, course_id=courseid, period=days)
+            db.session.add(entry)
+        entry.roundcount = roundcount
+        entry.best = best
+        entry.average = average
+        entry.improvement = improvement
+        entry.updated = now
+
+
+def update_roundleaderboards(rounds):
+    """
+    update_roundleaderboards updates leaderboard entries of every user and course that rounds are played by and on, once per pair. Caller commits.
+    """
+    for userid, courseid in sorted(set((round.rounduser_id, round.roundcourse_id) for round in rounds)):
+        update_leaderboard(userid, courseid)
+
+
+def refresh_leaderboards(courseids=None):
+    """
+    refresh_leaderboards recomputes leaderboards of courses, or every course when courseids is None, with one
+    INSERT ... SELECT per period. Periods move with time, so this should also be run daily. Returns number of entries.
+    """
+    now = datetime.utcnow()
+    leaderboards = Leaderboard.__table__
+    delete = leaderboards.delete()
+    if courseids is not None:
+        courseids = sorted(set(courseids))
+        if not courseids:
+            return 0
+        delete = delete.where(leaderboards.c.course_id.in_(courseids))
+    db.session.execute(delete)
+    count = 0
+    for days in PERIODS:
+        roundcount, best, average, improvement = period_columns(now, days)
+        select = db.select([Round.roundcourse_id, Round.rounduser_id, db.literal(days), roundcount, best, average, improvement,
+                            db.literal(now, db.DateTime)]) \
+            .where(db.and_(Round.totalscore != None, Round.rounddate >= now - timedelta(days=2 * days))) \
+            .group_by(Round.roundcourse_id, Round.rounduser_id) \
+            .having(roundcount > 0)
+        if courseids is not None:
+            select = select.where(Round.roundcourse_id.in_(courseids))
+        result = db.session.execute(leaderboards.insert().from_select(
+            ['course_id', 'user_id', 'period', 'roundcount', 'best', 'average', 'improvement', 'updated'], select))
+        count = count + result.rowcount
+    db.session.commit()
+    return count
+
+
+def get_leaderboard(courseid, period, board, limit=50):
+    """
+    get_leaderboard returns (username, Leaderboard) tuples of the top entries of a board of course with one query that
+    reads them in index order
+    """
+    column, ascending = BOARDS[board]
+    order = column.asc() if ascending else column.desc()
+    return db.session.query(User.username, Leaderboard) \
+        .join(User, User.id == Leaderboard.user_id) \
+        .filter(Leaderboard.course_id == courseid, Leaderboard.period == period, column != None) \
+        .order_by(order, Leaderboard.user_id.asc() if ascending else Leaderboard.user_id.desc()) \
+        .limit(limit) \
+        .all()
@@ -1,8 +1,10 @@
 from app import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import url_for, abort
 from flask_login import UserMixin
-from app import login
+from app import login, passwords
+from app.weather import WEATHER_UNKNOWN
+from app.passwords import HASH_LENGTH
 
 
 
@@ -10,9 +12,56 @@ from app import login
 @login.user_loader
 def load_user(id):
     """
-    Loads given users Id for Flask-Login to keep track logged users
+    Loads given users Id for Flask-Login to keep track logged users. Returns UserIdentity from identity cache,
+    and reads the user from database only when it is not cached.
     """
-    return User.query.get(int(id))
+    from app.identity import identity_cache
+    userid = int(id)
+    identity = identity_cache.get(userid)
+    if identity is None:
+        user = User.query.get(userid)
+        if user is None:
+            return None
+        identity = UserIdentity(user)
+        identity_cache.set(userid, identity)
+    return identity
+
+
+def get_userrounds(userid):
+    """
+    get_userrounds returns query of all rounds user has played in descending order by date. Course of every round is loaded in the same query.
+    Query reads from the replica when the request allows it.
+    """
+    playedrounds = Round.query.options(db.joinedload(Round.course)).filter_by(rounduser_id=userid)
+    return playedrounds.order_by(Round.rounddate.desc(), Round.id.desc()).using_replica()
+
+
+class UserIdentity(UserMixin):
+    """
+    Immutable snapshot of a User for Flask-Login. Has the fields pages need of the logged in user without a database session.
+    """
+    __slots__ = ('id', 'username', 'email')
+
+    def __init__(self, user):
+        object.__setattr__(self, 'id', user.id)
+        object.__setattr__(self, 'username', user.username)
+        object.__setattr__(self, 'email', user.email)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('UserIdentity is read-only, change the User instead')
+
+    def __repr__(self):
+        """
+        ___repr__ method tells python how to print objects of UserIdentity
+        """
+        return '<UserIdentity {}>'.format(self.username)
+
+    def get_rounds(self):
+        """
+        get_rounds returns rounds of the user like User.get_rounds
+        """
+        return get_userrounds(self.id)
+
 
 class User(UserMixin, db.Model):
     """
@@ -21,27 +70,33 @@ class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), index=True, unique=True)
     email = db.Column(db.String(120), index=True, unique=True)
-    password_hash = db.Column(db.String(128))
-    rounds = db.relationship('Round', backref='user', lazy='dynamic')
+    password_hash = db.Column(db.String(HASH_LENGTH))
+    rounds = db.relationship('Round', backref='user')
   
     def set_password(self, password):
         """
-        set_password creates hashed password for the user
+        set_password creates hashed password for the user with the configured hash method, in the password process pool
         """
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.hash(password)
 
     def check_password(self, password):
         """
-        check_password check user password when user try log in
+        check_password check user password when user try log in. Hash is checked in the password process pool.
+        """
+        return passwords.check(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """
+        password_needs_rehash tells if password hash was created with other method or salt length than configured
         """
-        return check_password_hash(self.password_hash, password)
+        return passwords.needs_rehash(self.password_hash)
 
     def get_rounds(self):
         """
-        get_rounds will retrieve all rounds user has been played from database and return them in descending order
+        get_rounds will retrieve all rounds user has been played from database and return them in descending order by date.
+        Course of every round is loaded in the same query.
         """
-        playedrounds = Round.query.filter_by(rounduser_id=self.id)
-        return playedrounds.order_by(Round.id.desc())
+        return get_userrounds(self.id)
 
     def __repr__(self):
         """
@@ -57,8 +112,10 @@ class Course(db.Model):
     coursename = db.Column(db.String(64), index=True, unique=True)
     courseholes = db.Column(db.Integer)
     courselocation = db.Column(db.String(64))
-    rounds = db.relationship('Round', backref='course', lazy='dynamic')
-    holes = db.relationship('Hole', backref='course', lazy='dynamic')
+    version = db.Column(db.Integer, default=1)
+    modified = db.Column(db.DateTime, default=datetime.utcnow)
+    rounds = db.relationship('Round', backref='course')
+    holes = db.relationship('Hole', backref='course', order_by='Hole.holenum')
     
     def __repr__(self):
         """
@@ -73,44 +130,102 @@ class Course(db.Model):
         holes = Hole.query.filter_by(holecourse_id=self.id)
         return holes
 
+    def touch(self):
+        """
+        touch increases version of this course and sets modification time, so that cached pages of the course are renewed.
+        Version of a stored course is increased in the UPDATE statement, so that concurrent edits do not write the same version.
+        """
+        if db.inspect(self).persistent:
+            self.version = db.func.coalesce(Course.version, 0) + 1
+        else:
+            self.version = (self.version or 0) + 1
+        self.modified = datetime.utcnow()
+
+    def add_holes(self, holepar=3):
+        """
+        add_holes creates default holes for this course with one multi-row insert. Course must be flushed to have an id.
+        """
+        rows = []
+        for holenum in range(1, self.courseholes + 1):
+            rows.append({'holenum': holenum, 'holepar': holepar, 'holecourse_id': self.id})
+        if rows:
+            db.session.execute(Hole.__table__.insert(), rows)
+        from app.layout import invalidate_layout
+        invalidate_layout(self.id)
+
     def get_coursepar(self):
         """
         get_coursepar will calculate sum of every par value from holes associated with course and return it
         """
-        holes = Hole.query.filter_by(holecourse_id=self.id)
-        par = 0
-        for hole in holes:
-            par = par + hole.holepar
-        return par
+        from app.layout import get_layout
+        return get_layout(self.id).coursepar
+
+    def get_layout(self):
+        """
+        get_layout returns pars and lengths of holes of this course, loaded once per request
+        """
+        from app.layout import get_layout
+        return get_layout(self.id)
+
+    def set_holepar(self, hole, holepar):
+        """
+        set_holepar changes par of a hole of this course and shifts stored par totals of every round played on this course by the difference
+        """
+        from app.layout import invalidate_layout
+        delta = holepar - (hole.holepar or 0)
+        hole.holepar = holepar
+        invalidate_layout(self.id)
+        if delta != 0:
+            Round.query.filter(Round.roundcourse_id == self.id, Round.totalpar != None) \
+                .update({Round.totalpar: Round.totalpar + delta}, synchronize_session=False)
 
     def get_rounds(self, userid):
         """
-        get_rounds will retrieve every round user has created for this course object and return them
+        get_rounds will retrieve every round user has created for this course object and return them in descending order by date.
+        Course of every round is loaded in the same query.
         """
-        rounds = Round.query.filter_by(roundcourse_id=self.id, rounduser_id=userid)
-        return rounds.order_by(Round.id.desc())
+        rounds = Round.query.options(db.joinedload(Round.course)).filter_by(roundcourse_id=self.id, rounduser_id=userid)
+        return rounds.order_by(Round.rounddate.desc(), Round.id.desc())
 
-    def get_holemean(self, userid, holenum):
+    def get_roundsversion(self, userid=None):
         """
-        get_holemean will calculate a mean for scores in particular hole of course, from all rounds user has created for this course object and return it
+        get_roundsversion returns (number of rounds, latest modification) of rounds user has created for this course object,
+        or of rounds of all users when userid is None. It changes whenever a round is created, changed or deleted.
         """
-        rounds = Round.query.filter_by(roundcourse_id=self.id, rounduser_id=userid)
-        holetotal = 0
-        for round in rounds:
-            holetotal = holetotal + round.get_holescore(holenum)
-        holemean = holetotal / rounds.count()
-        return holemean
+        query = db.session.query(db.func.count(Round.id), db.func.max(Round.modified)) \
+            .filter(Round.roundcourse_id == self.id)
+        if userid is not None:
+            query = query.filter(Round.rounduser_id == userid)
+        return query.one()
 
-    def get_roundmean(self, userid):
+    def get_holemean(self, userid, holenum):
         """
-        get_roundmean will calculate a mean for final result of rounds user has created for this course object 
+        get_holemean will calculate a mean for scores in particular hole of course, from all rounds user has created for this course object and return it.
+        Reads from the replica when the request allows it.
+        """
+        holemean = db.session.query(db.func.avg(Roundscore.score)) \
+            .join(Round, Round.id == Roundscore.round_id) \
+            .filter(Round.roundcourse_id == self.id, Round.rounduser_id == userid, Roundscore.hole == holenum) \
+            .using_replica() \
+            .scalar()
+        if holemean is None:
+            return None
+        return float(holemean)
+
+    def get_roundmean(self, userid):
         """
-        rounds = Round.query.filter_by(roundcourse_id=self.id, rounduser_id=userid)
-        roundtotal = 0
-        for round in rounds:
-            roundtotal = roundtotal + round.get_totalscore()
-        roundmean = roundtotal / rounds.count()
-        return roundmean
+        get_roundmean will calculate a mean for final result of rounds user has created for this course object.
+        Reads from the replica when the request allows it.
+        """
+        totals = db.session.query(db.func.sum(Roundscore.score).label('total')) \
+            .join(Round, Round.id == Roundscore.round_id) \
+            .filter(Round.roundcourse_id == self.id, Round.rounduser_id == userid) \
+            .group_by(Roundscore.round_id) \
+            .subquery()
+        roundmean = db.session.query(db.func.avg(totals.c.total)).using_replica().scalar()
+        if roundmean is None:
+            return None
+        return float(roundmean)
 
 class Hole(db.Model):
     """
@@ -119,6 +234,7 @@ class Hole(db.Model):
     __tablename__ = 'course_hole'
     __table_args__ = (
         db.UniqueConstraint('holenum', 'holecourse_id'),
+        db.Index('ix_course_hole_holecourse_id_holenum', 'holecourse_id', 'holenum', 'holepar', 'holelength'),
     )
     id = db.Column(db.Integer, primary_key=True)
     holenum = db.Column(db.Integer, index=True)
@@ -136,12 +252,23 @@ class Round(db.Model):
     """
     Model for Round Table. User can create multiple Rounds for one Course.
     """
+    __table_args__ = (
+        db.Index('ix_round_rounduser_id_rounddate', 'rounduser_id', 'rounddate', 'id'),
+        db.Index('ix_round_rounduser_id_roundcourse_id_rounddate', 'rounduser_id', 'roundcourse_id', 'rounddate', 'id'),
+        db.Index('ix_round_roundcourse_id', 'roundcourse_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     rounddate = db.Column(db.DateTime, default=datetime.utcnow)
     roundweather = db.Column(db.String(16))
     rounduser_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     roundcourse_id = db.Column(db.Integer, db.ForeignKey('course.id'))
-    roundscores = db.relationship('Roundscore', backref='round', lazy='dynamic')
+    totalscore = db.Column(db.Integer)
+    totalpar = db.Column(db.Integer)
+    totalob = db.Column(db.Integer)
+    version = db.Column(db.Integer, default=1)
+    modified = db.Column(db.DateTime, default=datetime.utcnow)
+    client_id = db.Column(db.String(36), index=True, unique=True)
+    roundscores = db.relationship('Roundscore', backref='round', order_by='Roundscore.hole', passive_deletes=True)
 
     def __repr__(self):
         """
@@ -149,12 +276,22 @@ class Round(db.Model):
         """
         return '<Round {}>'.format(self.id)
 
+    def touch(self):
+        """
+        touch increases version of this Round and sets modification time, so that cached pages of the Round are renewed.
+        Version of a stored Round is increased in the UPDATE statement, so that concurrent edits do not write the same version.
+        """
+        if db.inspect(self).persistent:
+            self.version = db.func.coalesce(Round.version, 0) + 1
+        else:
+            self.version = (self.version or 0) + 1
+        self.modified = datetime.utcnow()
+
     def get_coursename(self):
         """
-        get_coursename retrieves name of the Course this Round has been played on.
+        get_coursename retrieves name of the Course this Round has been played on. Uses the course loaded with the round when it is available.
         """
-        course = Course.query.filter_by(id=self.roundcourse_id).first()
-        return course.coursename
+        return self.course.coursename
     
     def get_date(self):
         """
@@ -172,25 +309,92 @@ class Round(db.Model):
     
     def get_totalscore(self):
         """
-        get_totalscore calculates the sum of all scores from Holes played this Round and returns it
+        get_totalscore returns the sum of all scores from Holes played this Round. Uses stored total when it exists.
         """
-        scores = Roundscore.query.filter_by(round_id=self.id)
-        totalscore = 0
-        for score in scores:
-            totalscore = totalscore + score.score
-        return totalscore
+        if self.totalscore is None:
+            self.update_totals()
+        return self.totalscore
     
     def get_totalscorepar(self):
         """
-        get_totalscorepar calculates the sum of all scores from Holes played this Round and then substracts it from sum of all par values of Holes played this Round
+        get_totalscorepar returns the sum of all scores from Holes played this Round substracted by sum of all par values of Holes played this Round. Uses stored totals when they exist.
         """
-        scores = Roundscore.query.filter_by(round_id=self.id)
-        totalscore = 0
-        for score in scores:
-            totalscore = totalscore + score.score
-        course = Course.query.filter_by(id=self.roundcourse_id).first_or_404()
-        par = course.get_coursepar()
-        return totalscore - par
+        if self.totalscore is None or self.totalpar is None:
+            self.update_totals()
+        return self.totalscore - self.totalpar
+
+    def update_totals(self):
+        """
+        update_totals calculates total score, total par and number of obs of this Round from database and stores them to the Round
+        """
+        totalscore, totalob = db.session.query(
+                db.func.coalesce(db.func.sum(Roundscore.score), 0),
+                db.func.coalesce(db.func.sum(db.case([(Roundscore.ob == True, 1)], else_=0)), 0)) \
+            .filter(Roundscore.round_id == self.id) \
+            .one()
+        from app.layout import get_layout
+        totalpar = get_layout(self.roundcourse_id).coursepar
+        self.totalscore = totalscore
+        self.totalpar = totalpar
+        self.totalob = totalob
+
+    def add_defaultscores(self, holes):
+        """
+        add_defaultscores creates par score for every hole of this Round with one multi-row insert and sets totals of the Round. Round must be flushed to have an id.
+        """
+        rows = []
+        coursepar = 0
+        for hole in holes:
+            rows.append({'hole': hole.holenum, 'score': hole.holepar, 'ob': False, 'round_id': self.id})
+            coursepar = coursepar + hole.holepar
+        if rows:
+            db.session.execute(Roundscore.__table__.insert(), rows)
+        self.totalscore = coursepar
+        self.totalpar = coursepar
+        self.totalob = 0
+
+    def add_holescore(self, holenum, score, ob, client_id=None, updated=None):
+        """
+        add_holescore creates score for one hole of this Round and updates totals of the Round in the same transaction.
+        client_id and updated identify the change when it comes from an offline client.
+        """
+        roundscore = Roundscore(hole=holenum, score=score, ob=ob, round_id=self.id, client_id=client_id,
+                                updated=updated or datetime.utcnow())
+        db.session.add(roundscore)
+        self.touch()
+        if self.totalscore is None:
+            db.session.flush()
+            self.update_totals()
+        else:
+            self.totalscore = self.totalscore + score
+            self.totalob = (self.totalob or 0) + (1 if ob else 0)
+        return roundscore
+
+    def update_holescore(self, roundscore, score, ob, client_id=None, updated=None):
+        """
+        update_holescore changes score of one hole of this Round and updates totals of the Round in the same transaction.
+        client_id and updated identify the change when it comes from an offline client.
+        """
+        self.touch()
+        roundscore.client_id = client_id
+        roundscore.updated = updated or datetime.utcnow()
+        if self.totalscore is None:
+            roundscore.score = score
+            roundscore.ob = ob
+            db.session.flush()
+            self.update_totals()
+            return
+        self.totalscore = self.totalscore - roundscore.score + score
+        self.totalob = (self.totalob or 0) - (1 if roundscore.ob else 0) + (1 if ob else 0)
+        roundscore.score = score
+        roundscore.ob = ob
+
+    def get_scorecard(self):
+        """
+        get_scorecard returns holes of the course and scores of this Round as Scorecard, loaded with one query
+        """
+        from app.scorecard import load_scorecard
+        return load_scorecard(self.id, self.roundcourse_id)
 
     def get_holescore(self, holenum):
         """
@@ -201,12 +405,18 @@ class Round(db.Model):
 
     def get_weatherurl(self):
         """
-        get_weatherurl returns a url for weather icon 
+        get_weatherurl returns a url for weather icon. Returns local unknown icon when weather is not known (yet).
         """
+        if self.roundweather is None or self.roundweather == WEATHER_UNKNOWN:
+            return url_for('static', filename='weather-unknown.svg')
         url = "http://openweathermap.org/img/wn/" + self.roundweather + ".png"
         return url
 
 
+# highest score of one hole that is accepted from clients, scores are stored in INTEGER columns
+MAX_SCORE = 99
+
+
 class Roundscore(db.Model):
     """
     Model for round_hole table. Round has multiple round_hole objects. a Round is played on a Course and every Hole a Course has, there must be corresponding round_hole
@@ -214,12 +424,15 @@ class Roundscore(db.Model):
     __tablename__ = 'round_hole'
     __table_args__ = (
         db.UniqueConstraint('hole', 'round_id'),
+        db.Index('ix_round_hole_round_id_hole', 'round_id', 'hole', 'score', 'ob'),
     )
     id = db.Column(db.Integer, primary_key=True)
     hole = db.Column(db.Integer)
     score = db.Column(db.Integer)
     ob = db.Column(db.Boolean)
-    round_id = db.Column(db.Integer, db.ForeignKey('round.id'))
+    round_id = db.Column(db.Integer, db.ForeignKey('round.id', ondelete='CASCADE'))
+    client_id = db.Column(db.String(36))
+    updated = db.Column(db.DateTime)
     
     def __repr__(self):
         """
@@ -230,7 +443,113 @@ class Roundscore(db.Model):
     
     def get_par(self, courseid):
         """
-        get_par retrieves par value of corresponding Hole
+        get_par retrieves par value of corresponding Hole from layout of the course
+        """
+        from app.layout import get_layout
+        holepar = get_layout(courseid).get_par(self.hole)
+        if holepar is None:
+            abort(404)
+        return holepar
+
+
+class Rating(db.Model):
+    """
+    Model for Rating table. Rating of a user on a course is the mean of score minus course par of the last rounds.
+    Maintained by app.rating.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'course_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), index=True)
+    roundcount = db.Column(db.Integer)
+    rating = db.Column(db.Float)
+    updated = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        """
+        ___repr__ method tells python how to print objects of Rating
         """
-        hole = Hole.query.filter_by(holecourse_id=courseid, holenum=self.hole).first_or_404()
-        return hole.holepar
+        return '<Rating {} {}>'.format(self.user_id, self.course_id)
+
+
+class Leaderboard(db.Model):
+    """
+    Model for Leaderboard table. One entry per course, period in days and user. Maintained by app.leaderboard.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('course_id', 'period', 'user_id'),
+        db.Index('ix_leaderboard_course_id_period_best', 'course_id', 'period', 'best', 'user_id'),
+        db.Index('ix_leaderboard_course_id_period_average', 'course_id', 'period', 'average', 'user_id'),
+        db.Index('ix_leaderboard_course_id_period_improvement', 'course_id', 'period', 'improvement', 'user_id'),
+        db.Index('ix_leaderboard_user_id_course_id', 'user_id', 'course_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    period = db.Column(db.Integer)
+    roundcount = db.Column(db.Integer)
+    best = db.Column(db.Integer)
+    average = db.Column(db.Float)
+    improvement = db.Column(db.Float)
+    updated = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        """
+        ___repr__ method tells python how to print objects of Leaderboard
+        """
+        return '<Leaderboard {} {} {}>'.format(self.course_id, self.period, self.user_id)
+
+
+def get_coursesversion():
+    """
+    get_coursesversion returns (number of courses, latest modification) of all courses. It changes whenever a course is created or changed.
+    """
+    return db.session.query(db.func.count(Course.id), db.func.max(Course.modified)).one()
+
+
+def backfill_roundtotals():
+    """
+    backfill_roundtotals calculates stored totals for every Round with one UPDATE statement. Returns number of updated rounds.
+    """
+    scores = Roundscore.__table__
+    holes = Hole.__table__
+    rounds = Round.__table__
+    totalscore = db.select([db.func.coalesce(db.func.sum(scores.c.score), 0)]) \
+        .where(scores.c.round_id == rounds.c.id).as_scalar()
+    totalob = db.select([db.func.count(scores.c.id)]) \
+        .where(db.and_(scores.c.round_id == rounds.c.id, scores.c.ob == True)).as_scalar()
+    totalpar = db.select([db.func.coalesce(db.func.sum(holes.c.holepar), 0)]) \
+        .where(holes.c.holecourse_id == rounds.c.roundcourse_id).as_scalar()
+    result = db.session.execute(rounds.update().values(totalscore=totalscore, totalob=totalob, totalpar=totalpar))
+    db.session.commit()
+    return result.rowcount
+
+
+def delete_rounds(roundids=None, before=None, courseid=None):
+    """
+    delete_rounds deletes rounds by id, rounds played before a date and/or rounds of a course with one DELETE statement.
+    Scores are deleted by ON DELETE CASCADE. Ratings and leaderboards of affected users and courses are recomputed.
+    Returns number of deleted rounds.
+    """
+    rounds = Round.__table__
+    conditions = []
+    if roundids is not None:
+        conditions.append(rounds.c.id.in_(list(roundids)))
+    if before is not None:
+        conditions.append(rounds.c.rounddate < before)
+    if courseid is not None:
+        conditions.append(rounds.c.roundcourse_id == courseid)
+    if not conditions:
+        raise ValueError('delete_rounds needs at least one condition')
+    condition = db.and_(*conditions)
+    pairs = db.session.execute(db.select([rounds.c.rounduser_id, rounds.c.roundcourse_id]).where(condition).distinct()).fetchall()
+    result = db.session.execute(rounds.delete().where(condition))
+    db.session.commit()
+    if pairs:
+        from app.rating import recompute_ratings
+        from app.leaderboard import refresh_leaderboards
+        recompute_ratings(set(userid for userid, courseid in pairs))
+        refresh_leaderboards(set(courseid for userid, courseid in pairs))
+    return result.rowcount
@@ -0,0 +1,79 @@
+from datetime import datetime
+from app import db
+from app.models import Round
+
+# Contains keyset pagination for round listings. Pages are fetched with WHERE (rounddate, id) < cursor instead of OFFSET,
+# so every page costs the same and no COUNT query is needed.
+
+CURSOR_DATEFORMAT = '%Y%m%d%H%M%S%f'
+
+
+class KeysetPage(object):
+    """
+    One page of rounds and cursors to the pages next to it
+    """
+    __slots__ = ('items', 'next_cursor', 'prev_cursor')
+
+    def __init__(self, items, next_cursor, prev_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def encode_cursor(round):
+    """
+    encode_cursor creates cursor string from rounddate and id of a round
+    """
+    return '{}_{}'.format(round.rounddate.strftime(CURSOR_DATEFORMAT), round.id)
+
+
+def decode_cursor(cursor):
+    """
+    decode_cursor returns (rounddate, id) tuple from cursor string or None if cursor is not valid
+    """
+    if not cursor:
+        return None
+    try:
+        date, id = cursor.split('_')
+        return datetime.strptime(date, CURSOR_DATEFORMAT), int(id)
+    except ValueError:
+        return None
+
+
+def keyset_paginate(query, per_page, after=None, before=None):
+    """
+    keyset_paginate returns KeysetPage of rounds from query, newest first. after gives page of rounds older than the cursor,
+    before gives page of rounds newer than the cursor, without them first page is returned.
+    """
+    key = db.tuple_(Round.rounddate, Round.id)
+    after = decode_cursor(after)
+    before = decode_cursor(before) if after is None else None
+    if before is not None:
+        rows = query.filter(key > db.tuple_(*before)) \
+            .order_by(None).order_by(Round.rounddate.asc(), Round.id.asc()) \
+            .limit(per_page + 1).all()
+        if not rows:
+            # newer rounds have been deleted, show the first page
+            return keyset_paginate(query, per_page)
+        has_newer = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_older = True
+    else:
+        if after is not None:
+            query = query.filter(key < db.tuple_(*after))
+        rows = query.order_by(None).order_by(Round.rounddate.desc(), Round.id.desc()) \
+            .limit(per_page + 1).all()
+        items = rows[:per_page]
+        has_older = len(rows) > per_page
+        has_newer = after is not None
+    next_cursor = encode_cursor(items[-1]) if items and has_older else None
+    prev_cursor = encode_cursor(items[0]) if items and has_newer else None
+    return KeysetPage(items, next_cursor, prev_cursor)
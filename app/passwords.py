@@ -0,0 +1,105 @@
+import hashlib
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+# Contains password hashing. Hashing is CPU-bound, so it is done in a bounded pool of worker processes. Request threads
+# wait for the result without holding the GIL, and at most PASSWORD_WORKERS hashes are calculated at the same time
+# however many users log in at once. Hash method and salt length come from config.
+
+# length of password_hash column of User
+HASH_LENGTH = 256
+
+
+def normalize_method(method):
+    """
+    normalize_method returns hash method the way werkzeug writes it to hashes, so that it can be compared with method of
+    a stored hash. PBKDF2 without iteration count, like pbkdf2:sha256, gets werkzeug's default iteration count.
+    """
+    if not method.startswith('pbkdf2:'):
+        return method
+    args = method[len('pbkdf2:'):].split(':')
+    iterations = int(args[1] or 0) if len(args) > 1 else 0
+    return 'pbkdf2:{}:{:d}'.format(args[0], iterations or DEFAULT_PBKDF2_ITERATIONS)
+
+
+def hash_length(method, saltlength):
+    """
+    hash_length returns length of hashes werkzeug creates with method and salt length, method$salt$hexdigest
+    """
+    name = method[len('pbkdf2:'):].split(':')[0] if method.startswith('pbkdf2:') else method
+    return len(method) + saltlength + 2 + hashlib.new(name).digest_size * 2
+
+
+class Passwords(object):
+    """
+    Password hashing with configurable method and a process pool. Works like other Flask extensions, create with app
+    or call init_app later. With PASSWORD_WORKERS set to 0 hashing is done in the calling thread.
+    """
+
+    def __init__(self, app=None):
+        self.method = 'pbkdf2:sha256:150000'
+        self.saltlength = 8
+        self.workers = 2
+        self._executor = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        init_app reads password settings from app config. Raises ValueError when hashes of the configured method and
+        salt length do not fit to the database.
+        """
+        self.method = normalize_method(app.config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:150000'))
+        self.saltlength = app.config.get('PASSWORD_SALT_LENGTH', 8)
+        self.workers = app.config.get('PASSWORD_WORKERS', 2)
+        length = hash_length(self.method, self.saltlength)
+        if length > HASH_LENGTH:
+            raise ValueError('Password hashes of {} with salt length {} have {} characters, at most {} fit to the database'
+                             .format(self.method, self.saltlength, length, HASH_LENGTH))
+
+    def get_executor(self):
+        """
+        get_executor returns process pool. Pool is created on first use, so that every gunicorn worker gets its own after fork.
+        Pool processes are started with forkserver, or spawn where it is not available, because forking a worker that
+        already runs request threads can copy locks that are held by other threads.
+        """
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+        return self._executor
+
+    def _run(self, function, *args):
+        """
+        _run calls function in the process pool and waits for the result, or calls it directly when pool is disabled
+        """
+        if not self.workers:
+            return function(*args)
+        return self.get_executor().submit(function, *args).result()
+
+    def hash(self, password):
+        """
+        hash returns hash of password with the configured method and salt length
+        """
+        return self._run(generate_password_hash, password, self.method, self.saltlength)
+
+    def check(self, pwhash, password):
+        """
+        check tells if password matches hash. Hashes of any method werkzeug supports are accepted.
+        """
+        if not pwhash:
+            return False
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """
+        needs_rehash tells if hash was created with other method or salt length than the configured ones
+        """
+        if not pwhash or pwhash.count('$') < 2:
+            return True
+        method, salt, value = pwhash.split('$', 2)
+        return method != self.method or len(salt) != self.saltlength
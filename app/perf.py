@@ -0,0 +1,218 @@
+import heapq
+import json
+import logging
+import threading
+import time
+from flask import g, request, has_request_context
+from jinja2 import Template
+
+# Contains opt-in performance instrumentation. When PERF_ENABLED is set, SQL statements, database time and template
+# render time are recorded for every request, sent in Server-Timing header, logged and aggregated per endpoint.
+# When it is not set no hooks are registered at all, so disabled instrumentation costs nothing.
+
+logger = logging.getLogger(__name__)
+
+
+class RequestStats(object):
+    """
+    Queries, database time and template render time of one request. Times are in seconds.
+    """
+
+    def __init__(self, slowest=5):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.dbtime = 0.0
+        self.rendertime = 0.0
+        self.slowest = slowest
+        self.statements = []
+
+    def add_statement(self, statement, duration):
+        """
+        add_statement counts statement and keeps it if it is one of the slowest statements of the request
+        """
+        self.queries = self.queries + 1
+        self.dbtime = self.dbtime + duration
+        entry = (duration, self.queries, statement)
+        if len(self.statements) < self.slowest:
+            heapq.heappush(self.statements, entry)
+        elif duration > self.statements[0][0]:
+            heapq.heapreplace(self.statements, entry)
+
+    def get_slowest(self):
+        """
+        get_slowest returns (duration, statement) tuples of the slowest statements, slowest first
+        """
+        return [(duration, statement) for duration, number, statement in sorted(self.statements, reverse=True)]
+
+
+class EndpointStats(object):
+    """
+    Aggregated stats of all instrumented requests of one endpoint
+    """
+
+    def __init__(self, endpoint, slowest=5):
+        self.endpoint = endpoint
+        self.requests = 0
+        self.totaltime = 0.0
+        self.maxtime = 0.0
+        self.queries = 0
+        self.maxqueries = 0
+        self.dbtime = 0.0
+        self.rendertime = 0.0
+        self.slowest = slowest
+        self.statements = {}
+
+    def add(self, stats, total):
+        """
+        add adds stats of one request. Slowest statements are kept by statement text, so repeated statements are listed once.
+        """
+        self.requests = self.requests + 1
+        self.totaltime = self.totaltime + total
+        self.maxtime = max(self.maxtime, total)
+        self.queries = self.queries + stats.queries
+        self.maxqueries = max(self.maxqueries, stats.queries)
+        self.dbtime = self.dbtime + stats.dbtime
+        self.rendertime = self.rendertime + stats.rendertime
+        for duration, statement in stats.get_slowest():
+            if duration > self.statements.get(statement, 0.0):
+                self.statements[statement] = duration
+        if len(self.statements) > self.slowest:
+            self.statements = dict(heapq.nlargest(self.slowest, self.statements.items(), key=lambda item: item[1]))
+
+    def to_dict(self):
+        """
+        to_dict returns means and maximums of the endpoint in milliseconds
+        """
+        return {
+            'endpoint': self.endpoint,
+            'requests': self.requests,
+            'mean_ms': round(self.totaltime / self.requests * 1000.0, 2),
+            'max_ms': round(self.maxtime * 1000.0, 2),
+            'mean_queries': round(self.queries / float(self.requests), 1),
+            'max_queries': self.maxqueries,
+            'mean_db_ms': round(self.dbtime / self.requests * 1000.0, 2),
+            'mean_render_ms': round(self.rendertime / self.requests * 1000.0, 2),
+            'slowest': [{'ms': round(duration * 1000.0, 2), 'statement': statement}
+                        for statement, duration in sorted(self.statements.items(), key=lambda item: item[1], reverse=True)],
+        }
+
+
+class TimedTemplate(Template):
+    """
+    Jinja template that adds its render time to stats of the current request
+    """
+
+    def render(self, *args, **kwargs):
+        stats = g.get('perfstats') if has_request_context() else None
+        if stats is None:
+            return super(TimedTemplate, self).render(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return super(TimedTemplate, self).render(*args, **kwargs)
+        finally:
+            stats.rendertime = stats.rendertime + time.perf_counter() - start
+
+
+class Perf(object):
+    """
+    Per-request query counting and timing. Works like other Flask extensions, create with app or call init_app later.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self.slowest = 5
+        self.admins = set()
+        self._endpoints = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        init_app reads perf settings from app config and registers hooks when instrumentation is enabled
+        """
+        self.app = app
+        self.enabled = app.config.get('PERF_ENABLED', False)
+        self.slowest = app.config.get('PERF_SLOWEST', 5)
+        self.admins = set(int(userid) for userid in app.config.get('PERF_ADMINS', ()))
+        if not self.enabled:
+            return
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        event.listen(Engine, 'before_cursor_execute', self._before_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_execute)
+        event.listen(Engine, 'handle_error', self._handle_error)
+        app.jinja_env.template_class = TimedTemplate
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def is_admin(self, user):
+        """
+        is_admin tells if user may see aggregated stats. Admins are listed by user id, usernames can be changed by the users.
+        """
+        return user.is_authenticated and user.id in self.admins
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'perfstats' in g:
+            conn.info.setdefault('perfstart', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('perfstart')
+        if not starts or not has_request_context():
+            return
+        duration = time.perf_counter() - starts.pop()
+        stats = g.get('perfstats')
+        if stats is not None:
+            stats.add_statement(statement, duration)
+
+    def _handle_error(self, context):
+        # after_cursor_execute is not called when the statement raises, so its start time is removed here
+        if context.execution_context is None or context.connection is None or not has_request_context() or 'perfstats' not in g:
+            return
+        starts = context.connection.info.get('perfstart')
+        if starts:
+            starts.pop()
+
+    def _before_request(self):
+        g.perfstats = RequestStats(self.slowest)
+
+    def _after_request(self, response):
+        stats = g.pop('perfstats', None)
+        if stats is None:
+            return response
+        total = time.perf_counter() - stats.start
+        endpoint = request.endpoint or 'unknown'
+        response.headers.add('Server-Timing', 'db;dur={:.2f};desc="{} queries", render;dur={:.2f}, total;dur={:.2f}'.format(
+            stats.dbtime * 1000.0, stats.queries, stats.rendertime * 1000.0, total * 1000.0))
+        logger.info(json.dumps({
+            'endpoint': endpoint,
+            'method': request.method,
+            'status': response.status_code,
+            'ms': round(total * 1000.0, 2),
+            'queries': stats.queries,
+            'db_ms': round(stats.dbtime * 1000.0, 2),
+            'render_ms': round(stats.rendertime * 1000.0, 2),
+            'slowest': [{'ms': round(duration * 1000.0, 2), 'statement': statement} for duration, statement in stats.get_slowest()],
+        }))
+        with self._lock:
+            if endpoint not in self._endpoints:
+                self._endpoints[endpoint] = EndpointStats(endpoint, self.slowest)
+            self._endpoints[endpoint].add(stats, total)
+        return response
+
+    def get_endpoints(self):
+        """
+        get_endpoints returns aggregated stats of every endpoint as dictionaries, slowest mean first
+        """
+        with self._lock:
+            endpoints = [stats.to_dict() for stats in self._endpoints.values()]
+        return sorted(endpoints, key=lambda endpoint: endpoint['mean_ms'], reverse=True)
+
+    def clear(self):
+        """
+        clear removes aggregated stats
+        """
+        with self._lock:
+            self._endpoints.clear()
@@ -0,0 +1,127 @@
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+# Contains database connection pool settings and pool metrics. Pool options come from config, SQLite gets WAL mode and
+# pragmas instead. Time spent waiting for a free connection is measured, so that workers and pool can be sized together.
+
+
+class PoolMetrics(object):
+    """
+    Counts connection checkouts and the time requests waited for a connection from the pool
+    """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.waittime = 0.0
+        self.maxwait = 0.0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def add_wait(self, seconds):
+        """
+        add_wait records one checkout that waited given time
+        """
+        with self._lock:
+            self.checkouts = self.checkouts + 1
+            self.waittime = self.waittime + seconds
+            self.maxwait = max(self.maxwait, seconds)
+
+    def add_timeout(self):
+        """
+        add_timeout records checkout that gave up after pool timeout
+        """
+        with self._lock:
+            self.timeouts = self.timeouts + 1
+
+    def to_dict(self):
+        """
+        to_dict returns checkout counts and wait times in milliseconds
+        """
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'mean_wait_ms': round(self.waittime / self.checkouts * 1000.0, 3) if self.checkouts else None,
+                'max_wait_ms': round(self.maxwait * 1000.0, 3),
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that records how long every checkout waited for a connection
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super(InstrumentedQueuePool, self)._do_get()
+        except exc.TimeoutError:
+            pool_metrics.add_timeout()
+            raise
+        pool_metrics.add_wait(time.perf_counter() - start)
+        return connection
+
+
+def configure_engine(config):
+    """
+    configure_engine returns SQLALCHEMY_ENGINE_OPTIONS from pool settings of config. SQLite does not use a connection
+    pool, so for SQLite no options are returned. Its pragmas are set by register_sqlite_pragmas when the engine is created.
+    """
+    if config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        return {}
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': config.get('DB_POOL_SIZE', 8),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 2),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 10),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', True),
+    }
+    statementtimeout = config.get('DB_STATEMENT_TIMEOUT')
+    if statementtimeout and config['SQLALCHEMY_DATABASE_URI'].startswith('postgres'):
+        options['connect_args'] = {'options': '-c statement_timeout={}'.format(statementtimeout)}
+    return options
+
+
+def register_sqlite_pragmas(engine, wal, busytimeout):
+    """
+    register_sqlite_pragmas sets pragmas of every new connection of a SQLite engine. Foreign keys are always enforced,
+    because deleting rounds relies on ON DELETE CASCADE. WAL lets pages read while a score is written. Other engines
+    are left as they are.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    def connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.execute('PRAGMA busy_timeout={:d}'.format(busytimeout))
+        if wal:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
+    event.listen(engine, 'connect', connect)
+
+
+def get_poolstatus(engine):
+    """
+    get_poolstatus returns state of the connection pool of engine and checkout metrics as dictionary
+    """
+    pool = engine.pool
+    status = {'pool': type(pool).__name__, 'status': pool.status()}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'max_overflow': pool._max_overflow,
+        })
+    status.update(pool_metrics.to_dict())
+    return status
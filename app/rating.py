@@ -0,0 +1,123 @@
+from datetime import datetime
+from app import app, db
+from app.models import Course, Hole, Rating, Round
+
+# Contains player ratings. Rating of a user on a course is the mean of total score minus course par over the user's
+# last RATING_ROUNDS rounds on the course. Ratings are stored in Rating table and updated when rounds are finished or
+# deleted. Update reads only the last rounds of one user and course, never the full history.
+
+
+def get_ratingrounds():
+    """
+    get_ratingrounds returns number of latest rounds a rating is calculated from
+    """
+    return app.config.get('RATING_ROUNDS', 10)
+
+
+def update_rating(userid, courseid):
+    """
+    update_rating calculates rating of user on course from the last rounds and stores it. Rounds are read with one query
+    that uses the (user, course, date) index, so cost does not depend on how many rounds user has played. Caller commits.
+    Returns the Rating, or None when user has no rounds on the course.
+    """
+    course = Course.query.filter_by(id=courseid).first()
+    rating = Rating.query.filter_by(user_id=userid, course_id=courseid).first()
+    totals = []
+    if course is not None:
+        totals = [totalscore for (totalscore,) in db.session.query(Round.totalscore)
+                  .filter(Round.rounduser_id == userid, Round.roundcourse_id == courseid, Round.totalscore != None)
+                  .order_by(Round.rounddate.desc(), Round.id.desc())
+                  .limit(get_ratingrounds())]
+    if not totals:
+        if rating is not None:
+            db.session.delete(rating)
+        return None
+    coursepar = course.get_coursepar()
+    if rating is None:
+        rating = Rating(user_id=userid, course_id=courseid)
+        db.session.add(rating)
+    rating.roundcount = len(totals)
+    rating.rating = sum(totalscore - coursepar for totalscore in totals) / float(len(totals))
+    rating.updated = datetime.utcnow()
+    return rating
+
+
+def update_roundratings(rounds):
+    """
+    update_roundratings updates rating of every user and course that rounds are played by and on, once per pair. Caller commits.
+    """
+    for userid, courseid in sorted(set((round.rounduser_id, round.roundcourse_id) for round in rounds)):
+        update_rating(userid, courseid)
+
+
+def recompute_ratings(userids=None, batchsize=500, courseids=None):
+    """
+    recompute_ratings calculates ratings of users from scratch. Users are processed in batches, and every batch is one
+    DELETE and one INSERT ... SELECT that ranks rounds with a window function, so rounds are never loaded to Python.
+    Recomputes all users when userids is None. When courseids is given, only ratings on those courses are recomputed,
+    and userids defaults to users who have played them. Returns number of stored ratings.
+    """
+    from app.models import User
+
+    if userids is None and courseids is not None:
+        userids = [id for (id,) in db.session.query(Round.rounduser_id)
+                   .filter(Round.roundcourse_id.in_(courseids), Round.rounduser_id != None)
+                   .distinct()
+                   .order_by(Round.rounduser_id.asc())]
+    elif userids is None:
+        userids = [id for (id,) in db.session.query(User.id).order_by(User.id.asc())]
+    else:
+        userids = sorted(set(userids))
+    holes = Hole.__table__
+    rounds = Round.__table__
+    ratings = Rating.__table__
+    courses = db.select([holes.c.holecourse_id.label('course_id'), db.func.sum(holes.c.holepar).label('coursepar')]) \
+        .group_by(holes.c.holecourse_id) \
+        .alias('courses')
+    count = 0
+    for start in range(0, len(userids), batchsize):
+        batch = userids[start:start + batchsize]
+        roundcondition = rounds.c.rounduser_id.in_(batch)
+        ratingcondition = ratings.c.user_id.in_(batch)
+        if courseids is not None:
+            roundcondition = db.and_(roundcondition, rounds.c.roundcourse_id.in_(courseids))
+            ratingcondition = db.and_(ratingcondition, ratings.c.course_id.in_(courseids))
+        ranked = db.select([
+                rounds.c.rounduser_id.label('user_id'),
+                rounds.c.roundcourse_id.label('course_id'),
+                (rounds.c.totalscore - courses.c.coursepar).label('differential'),
+                db.func.row_number().over(partition_by=(rounds.c.rounduser_id, rounds.c.roundcourse_id),
+                                          order_by=(rounds.c.rounddate.desc(), rounds.c.id.desc())).label('position')]) \
+            .select_from(rounds.join(courses, courses.c.course_id == rounds.c.roundcourse_id)) \
+            .where(db.and_(roundcondition, rounds.c.totalscore != None)) \
+            .alias('ranked')
+        latest = db.select([
+                ranked.c.user_id,
+                ranked.c.course_id,
+                db.func.count(ranked.c.differential),
+                db.cast(db.func.avg(ranked.c.differential), db.Float),
+                db.literal(datetime.utcnow(), db.DateTime)]) \
+            .where(ranked.c.position <= get_ratingrounds()) \
+            .group_by(ranked.c.user_id, ranked.c.course_id)
+        db.session.execute(ratings.delete().where(ratingcondition))
+        result = db.session.execute(ratings.insert().from_select(
+            ['user_id', 'course_id', 'roundcount', 'rating', 'updated'], latest))
+        db.session.commit()
+        count = count + result.rowcount
+    return count
+
+
+def get_ratings(userid):
+    """
+    get_ratings returns (coursename, roundcount, rating) tuples of user ordered by course name, and overall rating that is
+    the mean of course ratings weighted by number of rounds, or None
+    """
+    rows = db.session.query(Course.coursename, Rating.roundcount, Rating.rating) \
+        .join(Course, Course.id == Rating.course_id) \
+        .filter(Rating.user_id == userid) \
+        .order_by(Course.coursename.asc()) \
+        .all()
+    roundcount = sum(count for coursename, count, rating in rows)
+    if not roundcount:
+        return rows, None
+    return rows, sum(count * rating for coursename, count, rating in rows) / roundcount
@@ -0,0 +1,124 @@
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, session, has_request_context
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, BaseQuery
+from sqlalchemy import orm
+from sqlalchemy.sql.expression import Select
+from app.pool import register_sqlite_pragmas
+
+# Contains read replica routing. When REPLICA_DATABASE_URL is set, SELECT statements of read-only routes and of model
+# helpers marked with using_replica() go to the replica and everything else to the primary. A user who has written to
+# the primary reads from the primary for REPLICA_LAG seconds, so that a page shown right after saving a score is
+# never older than the save.
+
+
+def use_replica():
+    """
+    use_replica tells if reads of the current request may go to the replica
+    """
+    if not has_request_context():
+        return False
+    if not g.get('replica'):
+        return False
+    if g.get('dbwrite'):
+        return False
+    return session.get('primary_until', 0) < time.time()
+
+
+@contextmanager
+def replica():
+    """
+    replica is a context manager that lets reads inside it go to the replica
+    """
+    if not has_request_context():
+        yield
+        return
+    previous = g.get('replica', False)
+    g.replica = True
+    try:
+        yield
+    finally:
+        g.replica = previous
+
+
+def read_only(function):
+    """
+    read_only is a decorator for routes that only read data. Their reads go to the replica.
+    """
+    @wraps(function)
+    def route(*args, **kwargs):
+        g.replica = True
+        return function(*args, **kwargs)
+    return route
+
+
+class RoutingQuery(BaseQuery):
+    """
+    Query that can be sent to the replica with using_replica()
+    """
+    _replica = False
+
+    def using_replica(self):
+        """
+        using_replica returns copy of query that is read from the replica when the request allows it
+        """
+        query = self._clone()
+        query._replica = True
+        return query
+
+    def __iter__(self):
+        if not self._replica:
+            return super(RoutingQuery, self).__iter__()
+        with replica():
+            return super(RoutingQuery, self).__iter__()
+
+
+class RoutingSession(SignallingSession):
+    """
+    Session that sends SELECT statements to the replica bind when use_replica() allows it. Flushes and other
+    statements go to the primary and mark the request as a writer.
+    """
+
+    def __init__(self, db, **options):
+        self.db = db
+        SignallingSession.__init__(self, db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        if self._flushing or (clause is not None and not isinstance(clause, Select)):
+            if has_request_context():
+                g.dbwrite = True
+        elif 'replica' in (self.app.config.get('SQLALCHEMY_BINDS') or {}) and use_replica():
+            return self.db.get_engine(self.app, bind='replica')
+        return SignallingSession.get_bind(self, mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """
+    SQLAlchemy extension that uses RoutingSession and RoutingQuery, and remembers users who wrote to the primary.
+    SQLite pragmas are set on the engines it creates.
+    """
+    sqlite_pragmas = (True, 5000)
+
+    def __init__(self, app=None, **kwargs):
+        kwargs.setdefault('query_class', RoutingQuery)
+        SQLAlchemy.__init__(self, app, **kwargs)
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def create_engine(self, sa_url, engine_opts):
+        engine = SQLAlchemy.create_engine(self, sa_url, engine_opts)
+        register_sqlite_pragmas(engine, *self.sqlite_pragmas)
+        return engine
+
+    def init_app(self, app):
+        self.sqlite_pragmas = (app.config.get('SQLITE_WAL', True), app.config.get('SQLITE_BUSY_TIMEOUT', 5000))
+        SQLAlchemy.init_app(self, app)
+        lag = app.config.get('REPLICA_LAG', 5)
+
+        @app.after_request
+        def remember_writes(response):
+            if g.get('dbwrite') and 'replica' in (app.config.get('SQLALCHEMY_BINDS') or {}):
+                session['primary_until'] = time.time() + lag
+            return response
@@ -1,12 +1,20 @@
-from flask import render_template, flash, redirect, url_for, request
+from flask import render_template, flash, redirect, url_for, request, abort, jsonify
 from flask_login import login_user, logout_user, current_user, login_required
 from werkzeug.urls import url_parse
-from app import app, db
+from app import app, db, weather, perf
+from app.pool import get_poolstatus
+from app.replica import read_only
 from app.forms import LoginForm, RegistrationForm, EditProfileForm, CreateCourseForm, AddCourseHoleForm, EditHoleForm, CreateRoundForm, ScoreForm
-from app.models import User, Course, Hole, Round, Roundscore
+from app.models import User, Course, Hole, Round, Roundscore, get_coursesversion
+from app.stats import get_coursestats
+from app.analytics import get_courseanalytics
+from app.pagination import keyset_paginate
+from app.choices import course_choices
+from app.identity import identity_cache
+from app.httpcache import cached_page, latest
+from app.rating import update_rating, recompute_ratings, get_ratings
+from app.leaderboard import PERIODS, BOARDS, update_leaderboard, refresh_leaderboards, get_leaderboard
 from datetime import datetime, date
-from pyowm.owm import OWM
-import os
 
 
 # Contains different URLs that app has
@@ -15,15 +23,15 @@ import os
 @app.route('/')
 @app.route('/index')
 @login_required
+@read_only
 def index():
     """
-    Route for mainpage. Create pagination for rounds played by user 
+    Route for mainpage. Create pagination for rounds played by user. Pages are keyed by date and id of the rounds.
     """
-    page = request.args.get('page', 1, type=int)
-    rounds = current_user.get_rounds().paginate(page,5,False)
-    next_url = url_for('index', page=rounds.next_num) \
+    rounds = keyset_paginate(current_user.get_rounds(), 5, after=request.args.get('after'), before=request.args.get('before'))
+    next_url = url_for('index', after=rounds.next_cursor) \
         if rounds.has_next else None
-    prev_url = url_for('index', page=rounds.prev_num) \
+    prev_url = url_for('index', before=rounds.prev_cursor) \
         if rounds.has_prev else None
     return render_template('index.html', title='Home', rounds=rounds.items, next_url=next_url,
                            prev_url=prev_url)
@@ -32,7 +40,8 @@ def index():
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     """
-    Route for login page. Redirects to the index if user is already logged in.
+    Route for login page. Redirects to the index if user is already logged in. Password is hashed again with
+    the current hash method when it was hashed with old settings.
     """
     if current_user.is_authenticated:
         return redirect(url_for('index'))
@@ -42,6 +51,9 @@ def login():
         if user is None or not user.check_password(form.password.data):
             flash('Invalid username or password')
             return redirect(url_for('login'))
+        if user.password_needs_rehash():
+            user.set_password(form.password.data)
+            db.session.commit()
         login_user(user, remember=form.remember_me.data)
         next_page = request.args.get('next')
         if not next_page or url_parse(next_page).netloc != '':
@@ -80,29 +92,34 @@ def register():
 # User profile page
 @app.route('/user/<username>')
 @login_required
+@read_only
 def user(username):
     """
-    Route for user page.
+    Route for user page. Shows ratings of the user on every course played.
     """
     user = User.query.filter_by(username=username).first_or_404()
-    return render_template('user.html', user=user)
+    ratings, rating = get_ratings(user.id)
+    return render_template('user.html', user=user, ratings=ratings, rating=rating)
 
 @app.route('/edit_profile', methods=['GET', 'POST'])
 @login_required
 def edit_profile():
     """
-    Route for edit profile page. Gets data form EditProfileForm and update current user object.
+    Route for edit profile page. Gets data form EditProfileForm and update user object of current user.
+    Cached identity of the user is removed, so that the next request sees the changes.
     """
-    form = EditProfileForm(current_user.username, current_user.email)
+    user = User.query.get(current_user.id)
+    form = EditProfileForm(user.username, user.email)
     if form.validate_on_submit():
-        current_user.username = form.username.data
-        current_user.email = form.email.data
+        user.username = form.username.data
+        user.email = form.email.data
         db.session.commit()
+        identity_cache.invalidate(user.id)
         flash('Your changes have been saved.')
         return redirect(url_for('edit_profile'))
     elif request.method == 'GET':
-        form.username.data = current_user.username
-        form.email.data = current_user.email
+        form.username.data = user.username
+        form.email.data = user.email
     return render_template('edit_profile.html', title='Edit Profile', form=form)
     
 @app.route('/createcourse', methods=['GET', 'POST'])
@@ -115,13 +132,10 @@ def createcourse():
     if form.validate_on_submit():
         course = Course(coursename=form.coursename.data, courseholes=form.courseholes.data, courselocation=form.courselocation.data)
         db.session.add(course)
+        db.session.flush()
+        course.add_holes()
         db.session.commit()
-
-        for holenum in range(form.courseholes.data):
-            holenum = holenum+1
-            hole = Hole(holenum=holenum, holepar=3, holecourse_id=course.id)
-            db.session.add(hole)
-            db.session.commit()
+        course_choices.invalidate()
         
         flash('New course has been created!')
 
@@ -130,42 +144,57 @@ def createcourse():
 
 @app.route('/courses')
 @login_required
+@read_only
 def courses():
     """
-    route for courses page. Creates page for all courses
+    route for courses page. Creates page for all courses. Page is cached until a course is created or changed.
     """
     page = request.args.get('page', 1, type=int)
-    courses = Course.query.order_by(Course.coursename.desc()).paginate(page,5,False)
-    next_url = url_for('courses', page=courses.next_num) \
-        if courses.has_next else None
-    prev_url = url_for('courses', page=courses.prev_num) \
-        if courses.has_prev else None
-    return render_template('courses.html', courses = courses.items, next_url=next_url,
-                           prev_url=prev_url)
+    count, modified = get_coursesversion()
+
+    def context():
+        courses = Course.query.order_by(Course.coursename.desc()).paginate(page,5,False)
+        next_url = url_for('courses', page=courses.next_num) \
+            if courses.has_next else None
+        prev_url = url_for('courses', page=courses.prev_num) \
+            if courses.has_prev else None
+        return dict(courses = courses.items, next_url=next_url, prev_url=prev_url)
+
+    return cached_page(('courses', page, count, modified), modified, 'fragments/courses.html', 'cachedpage.html', 'Courses', context)
 
 @app.route('/course/<coursename>')
 @login_required
 def course(coursename):
     """
-    route for course page. 
+    route for course page. Page is cached until the course is changed.
     """
     course = Course.query.filter_by(coursename=coursename).first_or_404()
-    holes = Hole.query.filter_by(holecourse_id=course.id).order_by(Hole.holenum.asc())
-    return render_template('course.html', course=course, holes=holes)
+
+    def context():
+        holes = Hole.query.filter_by(holecourse_id=course.id).order_by(Hole.holenum.asc())
+        return dict(course=course, holes=holes)
+
+    return cached_page(('course', course.id, course.version), course.modified, 'fragments/course.html', 'cachedpage.html', course.coursename, context)
 
 @app.route('/edithole/<coursename>/<holenum>', methods=['GET', 'POST'])
 @login_required
 def edithole(coursename, holenum):
     """
-    Route for edithole page. Get data from EditHoleForm and update hole object.
+    Route for edithole page. Get data from EditHoleForm and update hole object. Ratings and leaderboards of the course
+    are recomputed when par changes, because they compare scores to par.
     """
     course = Course.query.filter_by(coursename=coursename).first_or_404()
     hole = Hole.query.filter_by(holenum = holenum, holecourse_id = course.id).first_or_404()
     form = EditHoleForm()
     if form.validate_on_submit():
-        hole.holepar = form.holepar.data
+        parchanged = hole.holepar != form.holepar.data
+        course.set_holepar(hole, form.holepar.data)
         hole.holelength = form.holelength.data
+        course.touch()
         db.session.commit()
+        if parchanged:
+            recompute_ratings(courseids=[course.id])
+            refresh_leaderboards([course.id])
         flash('Your changes have been saved.')
         return redirect(url_for('course', coursename=coursename ))
     elif request.method == 'GET':
@@ -179,34 +208,30 @@ def createround():
     """
     route for createround. gets data from CreateRoundForm and openweathermap,creates round and default values for scores.
     """
-    courses = Course.query.all()
     form = CreateRoundForm()
+    courses = form.course.choices
     if form.validate_on_submit():
-        course = Course.query.filter_by(coursename=form.course.data).first_or_404()
+        course = Course.query.filter_by(id=form.course.data).first_or_404()
         today = datetime.today()
         """
-        Get icon of current weather based on course location
+        Get icon of current weather based on course location. Weather is cached per location, and when it is not cached
+        and WEATHER_ASYNC is set it is stored to the round later by a background thread.
         """
-        key = os.getenv("OWM_KEY")
-        owm = OWM(key)
-        mgr = owm.weather_manager()
-        observation = mgr.weather_at_place(course.courselocation)
-        weather = observation.weather
-        icon = weather.weather_icon_name
+        icon = weather.get_cached_icon(course.courselocation)
+        if icon is None and not weather.asynchronous:
+            icon = weather.get_icon(course.courselocation)
         
+        holes = course.get_holes().order_by(Hole.holenum.asc()).all()
         round = Round(rounddate=today, roundweather=icon, rounduser_id= current_user.id ,roundcourse_id= course.id)
         db.session.add(round)
-        db.session.commit()
+        db.session.flush()
         """
         Create default values for scores
         """
-        holes = course.get_holes()
-        holenum = 1
-        for hole in holes:
-            roundscore = Roundscore(hole=holenum, score=hole.holepar, ob=False, round_id=round.id)
-            db.session.add(roundscore)
-            db.session.commit()
-            holenum = holenum+1
+        round.add_defaultscores(holes)
+        db.session.commit()
+        if icon is None:
+            weather.fill_round(round.id, course.courselocation)
         
         flash('New round has been started!')
         holenum = 1
@@ -218,6 +243,7 @@ def createround():
 def roundscores(roundid, holenum):
     """
     Route for roundscores page. Check if score is not somehow created else update default score.
+    Rating and leaderboard entries of the user on the course are updated when score of the last hole is saved.
     """
     round = Round.query.filter_by(id=roundid).first_or_404()
     course = Course.query.filter_by(id=round.roundcourse_id).first_or_404()
@@ -231,8 +257,10 @@ def roundscores(roundid, holenum):
     form = ScoreForm()
     if score is None:
         if form.validate_on_submit():
-            roundscore = Roundscore(hole=holenum, score=form.score.data, ob=form.ob.data, round_id = roundid)
-            db.session.add(roundscore)
+            round.add_holescore(holenum, form.score.data, form.ob.data)
+            if holenum == course.courseholes:
+                update_rating(round.rounduser_id, round.roundcourse_id)
+                update_leaderboard(round.rounduser_id, round.roundcourse_id)
             db.session.commit()
             flash('Score for hole' + str(holenum) + ' has been updated!')
             holenum = holenum+1
@@ -240,8 +268,10 @@ def roundscores(roundid, holenum):
         return render_template('roundscores.html', title='Round', coursename= course.coursename, holenum=holenum, roundid=roundid, form=form)
     else:
         if form.validate_on_submit():
-            score.score = form.score.data
-            score.ob = form.ob.data
+            round.update_holescore(score, form.score.data, form.ob.data)
+            if holenum == course.courseholes:
+                update_rating(round.rounduser_id, round.roundcourse_id)
+                update_leaderboard(round.rounduser_id, round.roundcourse_id)
             db.session.commit()
             flash('Score for hole' + str(holenum) + ' has been updated!')
             holenum = holenum+1
@@ -256,46 +286,101 @@ def roundscores(roundid, holenum):
 @login_required
 def roundview(roundid):
     """
-    route for roundview.
+    route for roundview. Page is cached until scores of the round or holes of the course are changed.
     """
     round = Round.query.filter_by(id=roundid).first_or_404()
-    scores = round.get_scores()
-    course = Course.query.filter_by(id=round.roundcourse_id).first_or_404()
-    return render_template('roundview.html', title='Roundview', scores=scores, course=course, round = round)
+    course = round.course
+
+    def context():
+        return dict(scorecard=round.get_scorecard(), course=course, round = round)
+
+    return cached_page(('roundview', round.id, round.version, course.version), latest(round.modified, course.modified),
+                       'fragments/roundview.html', 'cachedpage.html', 'Roundview', context)
     
 @app.route('/analyzecourse/<coursename>')
 @login_required
+@read_only
 def analyzecourse(coursename):
     """
-    Route for analyzecourse. Creates pages of rounds played.
+    Route for analyzecourse. Creates pages of rounds played, statistics of every hole and hole difficulty compared to
+    all players. Page is cached until the course or rounds played on it are changed.
     """
     course = Course.query.filter_by(coursename=coursename).first_or_404()
-    page = request.args.get('page', 1, type=int)
-    rounds = course.get_rounds(current_user.id).paginate(page,3,False)
-    next_url = url_for('analyzecourse', coursename = coursename, page=rounds.next_num) \
-        if rounds.has_next else None
-    prev_url = url_for('analyzecourse', coursename = coursename, page=rounds.prev_num) \
-        if rounds.has_prev else None
-    return render_template('analyzecourse.html', title='Analyze Course', course=course, rounds=rounds.items, next_url=next_url,
-                           prev_url=prev_url)
+    after = request.args.get('after')
+    before = request.args.get('before')
+    # rounds of all users are shown in hole difficulty, and they include rounds of the user
+    count, modified = course.get_roundsversion()
+
+    def context():
+        stats = get_coursestats(course.id, current_user.id)
+        analytics, fieldanalytics = get_courseanalytics(course.id, current_user.id)
+        rounds = keyset_paginate(course.get_rounds(current_user.id), 3, after=after, before=before)
+        next_url = url_for('analyzecourse', coursename = coursename, after=rounds.next_cursor) \
+            if rounds.has_next else None
+        prev_url = url_for('analyzecourse', coursename = coursename, before=rounds.prev_cursor) \
+            if rounds.has_prev else None
+        return dict(course=course, stats=stats, analytics=analytics, fieldanalytics=fieldanalytics, rounds=rounds.items,
+                    next_url=next_url, prev_url=prev_url)
+
+    key = ('analyzecourse', course.id, course.version, current_user.id, count, modified, after, before)
+    return cached_page(key, latest(modified, course.modified), 'fragments/analyzecourse.html', 'cachedpage.html', 'Analyze Course', context)
 
 @app.route('/delete/<roundid>')
 @login_required
 def delete(roundid):
     """
-    Route for delete round. After deleting redirects to index.
+    Route for delete round. Round is deleted with one DELETE statement and its scores by ON DELETE CASCADE.
+    After deleting redirects to index.
     """
     round = Round.query.filter_by(id=roundid).first()
-    if round.rounduser_id == current_user.id:   
-        if Round is None:
-            flash('Round Not Found')
-            return redirect(url_for('index'))
-        scores = Roundscore.query.filter_by(round_id=roundid)
-        for score in scores:
-            db.session.delete(score)
-        db.session.delete(round)
+    if round is None:
+        flash('Round Not Found')
+        return redirect(url_for('index'))
+    if round.rounduser_id == current_user.id:
+        userid, courseid = round.rounduser_id, round.roundcourse_id
+        db.session.expunge(round)
+        db.session.execute(Round.__table__.delete().where(Round.__table__.c.id == round.id))
+        update_rating(userid, courseid)
+        update_leaderboard(userid, courseid)
         db.session.commit()
         flash('Round has been deleted')
         return redirect(url_for('index'))
     flash("Delete failed")
-    return redirect(url_for('index'))
\ No newline at end of file
+    return redirect(url_for('index'))
+
+@app.route('/leaderboard/<coursename>')
+@login_required
+def leaderboard(coursename):
+    """
+    Route for leaderboard of a course. Board and period are selected with query parameters, top 50 users are shown.
+    """
+    course = Course.query.filter_by(coursename=coursename).first_or_404()
+    board = request.args.get('board', 'best')
+    period = request.args.get('period', PERIODS[0], type=int)
+    if board not in BOARDS or period not in PERIODS:
+        abort(404)
+    entries = get_leaderboard(course.id, period, board)
+    return render_template('leaderboard.html', title='Leaderboard', course=course, board=board, period=period,
+                           boards=sorted(BOARDS), periods=PERIODS, entries=entries)
+
+
+@app.route('/debug/perf')
+@login_required
+def debug_perf():
+    """
+    Route for aggregated request stats. Shown only to PERF_ADMINS when instrumentation is enabled, others get 404.
+    """
+    if not perf.enabled or not perf.is_admin(current_user):
+        abort(404)
+    return render_template('debugperf.html', title='Performance', endpoints=perf.get_endpoints())
+
+
+@app.route('/debug/pool')
+@login_required
+def debug_pool():
+    """
+    Route for state of the database connection pool of this worker process as JSON. Shown only to PERF_ADMINS, others get 404.
+    """
+    if not perf.is_admin(current_user):
+        abort(404)
+    return jsonify(get_poolstatus(db.engine))
@@ -0,0 +1,73 @@
+from collections import namedtuple
+from app import db
+from app.models import Hole, Roundscore
+
+# Contains scorecards of rounds. Holes of the course and scores of the round are loaded together with one query into
+# a compact value object, so templates can iterate the card without loading ORM rows or making per-hole queries.
+
+# One hole of a scorecard. score and ob are None when the hole has no score.
+ScorecardHole = namedtuple('ScorecardHole', ('hole', 'par', 'length', 'score', 'ob'))
+
+
+class Scorecard(object):
+    """
+    Hole numbers, pars, lengths, scores and OB flags of one round as parallel tuples
+    """
+    __slots__ = ('roundid', 'courseid', 'holes', 'pars', 'lengths', 'scores', 'obs')
+
+    def __init__(self, roundid, courseid, rows):
+        self.roundid = roundid
+        self.courseid = courseid
+        self.holes = tuple(row[0] for row in rows)
+        self.pars = tuple(row[1] for row in rows)
+        self.lengths = tuple(row[2] for row in rows)
+        self.scores = tuple(row[3] for row in rows)
+        self.obs = tuple(None if row[4] is None else bool(row[4]) for row in rows)
+
+    def __repr__(self):
+        """
+        ___repr__ method tells python how to print objects of Scorecard
+        """
+        return '<Scorecard {}>'.format(self.roundid)
+
+    def __len__(self):
+        return len(self.holes)
+
+    def __iter__(self):
+        """
+        Iterates ScorecardHole tuples in hole order
+        """
+        for row in zip(self.holes, self.pars, self.lengths, self.scores, self.obs):
+            yield ScorecardHole(*row)
+
+    def played(self):
+        """
+        played iterates ScorecardHole tuples of holes that have a score
+        """
+        for hole in self:
+            if hole.score is not None:
+                yield hole
+
+    @property
+    def coursepar(self):
+        return sum(par or 0 for par in self.pars)
+
+    @property
+    def totalscore(self):
+        return sum(score for score in self.scores if score is not None)
+
+    @property
+    def totalob(self):
+        return sum(1 for ob in self.obs if ob)
+
+
+def load_scorecard(roundid, courseid):
+    """
+    load_scorecard loads holes of course and scores of round with one outer join query ordered by hole number
+    """
+    rows = db.session.query(Hole.holenum, Hole.holepar, Hole.holelength, Roundscore.score, Roundscore.ob) \
+        .outerjoin(Roundscore, db.and_(Roundscore.hole == Hole.holenum, Roundscore.round_id == roundid)) \
+        .filter(Hole.holecourse_id == courseid) \
+        .order_by(Hole.holenum.asc()) \
+        .all()
+    return Scorecard(roundid, courseid, rows)
@@ -0,0 +1,103 @@
+from app import db
+from app.models import Hole, Round, Roundscore
+
+# Contains set-based statistics that are calculated for a course with aggregate queries
+
+
+class HoleStats(object):
+    """
+    Statistics of one hole of a course. Values are None when the hole has no scores.
+    """
+    __slots__ = ('holenum', 'holepar', 'count', 'mean', 'variance', 'best', 'worst')
+
+    def __init__(self, holenum, holepar, count, mean, variance, best, worst):
+        self.holenum = holenum
+        self.holepar = holepar
+        self.count = count
+        self.mean = mean
+        self.variance = variance
+        self.best = best
+        self.worst = worst
+
+    def __repr__(self):
+        """
+        ___repr__ method tells python how to print objects of HoleStats
+        """
+        return '<HoleStats {}>'.format(self.holenum)
+
+
+class CourseStats(object):
+    """
+    Statistics of all rounds one user has played on one course.
+    """
+    __slots__ = ('courseid', 'userid', 'holes', 'coursepar', 'roundcount', 'roundmean', 'roundbest', 'roundworst')
+
+    def __init__(self, courseid, userid, holes, roundcount, roundmean, roundbest, roundworst):
+        self.courseid = courseid
+        self.userid = userid
+        self.holes = holes
+        self.coursepar = sum(hole.holepar or 0 for hole in holes)
+        self.roundcount = roundcount
+        self.roundmean = roundmean
+        self.roundbest = roundbest
+        self.roundworst = roundworst
+
+    def __repr__(self):
+        """
+        ___repr__ method tells python how to print objects of CourseStats
+        """
+        return '<CourseStats {} {}>'.format(self.courseid, self.userid)
+
+
+def _float(value):
+    """
+    _float converts aggregate results to float. Postgres returns Decimal for avg, SQLite returns float.
+    """
+    if value is None:
+        return None
+    return float(value)
+
+
+def get_coursestats(courseid, userid):
+    """
+    get_coursestats calculates hole statistics and round statistics of a user on a course with two GROUP BY queries
+    and returns them as CourseStats object. Number of queries does not depend on number of rounds or holes.
+    """
+    scores = db.session.query(Roundscore.hole.label('hole'), Roundscore.score.label('score')) \
+        .join(Round, Round.id == Roundscore.round_id) \
+        .filter(Round.roundcourse_id == courseid, Round.rounduser_id == userid) \
+        .subquery()
+    holerows = db.session.query(
+            Hole.holenum,
+            Hole.holepar,
+            db.func.count(scores.c.score),
+            db.func.avg(scores.c.score),
+            db.func.sum(scores.c.score * scores.c.score),
+            db.func.min(scores.c.score),
+            db.func.max(scores.c.score)) \
+        .outerjoin(scores, scores.c.hole == Hole.holenum) \
+        .filter(Hole.holecourse_id == courseid) \
+        .group_by(Hole.holenum, Hole.holepar) \
+        .order_by(Hole.holenum.asc()) \
+        .all()
+    holes = []
+    for holenum, holepar, count, mean, sumsquares, best, worst in holerows:
+        mean = _float(mean)
+        variance = None
+        if count:
+            # population variance, rounding errors can make it slightly negative
+            variance = max(_float(sumsquares) / count - mean * mean, 0.0)
+        holes.append(HoleStats(holenum, holepar, count, mean, variance, best, worst))
+
+    totals = db.session.query(db.func.sum(Roundscore.score).label('total')) \
+        .join(Round, Round.id == Roundscore.round_id) \
+        .filter(Round.roundcourse_id == courseid, Round.rounduser_id == userid) \
+        .group_by(Roundscore.round_id) \
+        .subquery()
+    roundcount, roundmean, roundbest, roundworst = db.session.query(
+            db.func.count(totals.c.total),
+            db.func.avg(totals.c.total),
+            db.func.min(totals.c.total),
+            db.func.max(totals.c.total)) \
+        .one()
+    return CourseStats(courseid, userid, holes, roundcount, _float(roundmean), roundbest, roundworst)
@@ -0,0 +1,188 @@
+from datetime import datetime
+from app import db
+from app.models import Course, Hole, Round, Roundscore, MAX_SCORE
+
+# Contains synchronization of scores entered offline. Client sends whole rounds of changes, every change has client generated
+# id and timestamp. Changes are applied as upserts keyed on (hole, round_id), so sending same batch again changes nothing.
+
+
+class SyncError(Exception):
+    """
+    Raised when sync batch is malformed. Nothing of the batch is saved.
+    """
+    pass
+
+
+def parse_timestamp(value):
+    """
+    parse_timestamp converts ISO 8601 timestamp to naive UTC datetime
+    """
+    if not isinstance(value, str):
+        raise ValueError(value)
+    if value.endswith('Z'):
+        value = value[:-1]
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is not None:
+        timestamp = (timestamp - timestamp.utcoffset()).replace(tzinfo=None)
+    return timestamp
+
+
+def parse_batch(data):
+    """
+    parse_batch validates structure of sync request and returns list of rounds with parsed changes.
+    Raises SyncError with list of errors.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('rounds'), list):
+        raise SyncError(['Request body must be an object with list of rounds'])
+    errors = []
+    rounds = []
+    for index, entry in enumerate(data['rounds']):
+        where = 'rounds[{}]'.format(index)
+        if not isinstance(entry, dict):
+            errors.append(where + ' must be an object')
+            continue
+        roundid = entry.get('round')
+        client_id = entry.get('client_id')
+        if roundid is None and not (isinstance(client_id, str) and 0 < len(client_id) <= 36):
+            errors.append(where + ': round id or client_id of at most 36 characters is required')
+        if roundid is not None and (not isinstance(roundid, int) or isinstance(roundid, bool)):
+            errors.append(where + ': round must be an integer')
+        course = entry.get('course')
+        if roundid is None and (not isinstance(course, int) or isinstance(course, bool)):
+            errors.append(where + ': course id is required for new rounds')
+        date = None
+        if entry.get('date') is not None:
+            try:
+                date = parse_timestamp(entry['date'])
+            except ValueError:
+                errors.append(where + ': date must be ISO 8601 timestamp')
+        changes = []
+        entrychanges = entry.get('changes')
+        if entrychanges is None:
+            entrychanges = []
+        if not isinstance(entrychanges, list):
+            errors.append(where + ': changes must be a list')
+            entrychanges = []
+        for changeindex, change in enumerate(entrychanges):
+            changewhere = '{}.changes[{}]'.format(where, changeindex)
+            if not isinstance(change, dict):
+                errors.append(changewhere + ' must be an object')
+                continue
+            try:
+                timestamp = parse_timestamp(change.get('timestamp'))
+            except ValueError:
+                errors.append(changewhere + ': timestamp must be ISO 8601 timestamp')
+                continue
+            changeid = change.get('id')
+            hole = change.get('hole')
+            score = change.get('score')
+            ob = change.get('ob', False)
+            if not (isinstance(changeid, str) and 0 < len(changeid) <= 36):
+                errors.append(changewhere + ': id of at most 36 characters is required')
+            if not isinstance(hole, int) or isinstance(hole, bool):
+                errors.append(changewhere + ': hole must be an integer')
+            if not isinstance(score, int) or isinstance(score, bool) or not 1 <= score <= MAX_SCORE:
+                errors.append(changewhere + ': score must be an integer from 1 to {}'.format(MAX_SCORE))
+            if not isinstance(ob, bool):
+                errors.append(changewhere + ': ob must be true or false')
+            changes.append({'id': changeid, 'hole': hole, 'score': score, 'ob': ob, 'timestamp': timestamp})
+        # apply in order of time, so the latest change of a hole wins
+        changes.sort(key=lambda change: change['timestamp'])
+        rounds.append({'round': roundid, 'client_id': client_id, 'course': course, 'date': date,
+                       'changes': changes})
+    if errors:
+        raise SyncError(errors)
+    return rounds
+
+
+def load_rounds(entries, userid):
+    """
+    load_rounds loads existing rounds of sync batch with one query. Returns dictionaries by id and by client id.
+    """
+    ids = [entry['round'] for entry in entries if entry['round'] is not None]
+    client_ids = [entry['client_id'] for entry in entries if entry['round'] is None]
+    conditions = []
+    if ids:
+        conditions.append(Round.id.in_(ids))
+    if client_ids:
+        conditions.append(Round.client_id.in_(client_ids))
+    byid = {}
+    byclient = {}
+    if conditions:
+        for round in Round.query.filter(Round.rounduser_id == userid, db.or_(*conditions)):
+            byid[round.id] = round
+            if round.client_id is not None:
+                byclient[round.client_id] = round
+    return byid, byclient
+
+
+def sync_rounds(data, userid):
+    """
+    sync_rounds applies sync batch of user and returns result of every round. Existing rounds and their scores are read with
+    one query each and all changes are saved in one transaction. Change is skipped when the same change is already saved,
+    and reported as superseded when the score was changed later on the server or by a later change. Caller commits.
+    """
+    from app.layout import get_layout
+
+    entries = parse_batch(data)
+    byid, byclient = load_rounds(entries, userid)
+
+    # create rounds that were started offline
+    errors = []
+    created = []
+    for index, entry in enumerate(entries):
+        if entry['round'] is not None:
+            if entry['round'] not in byid:
+                errors.append('rounds[{}]: round {} not found'.format(index, entry['round']))
+            continue
+        if entry['client_id'] in byclient:
+            continue
+        course = Course.query.filter_by(id=entry['course']).first()
+        if course is None:
+            errors.append('rounds[{}]: course {} not found'.format(index, entry['course']))
+            continue
+        round = Round(rounddate=entry['date'] or datetime.utcnow(), rounduser_id=userid, roundcourse_id=course.id,
+                      client_id=entry['client_id'])
+        db.session.add(round)
+        byclient[entry['client_id']] = round
+        created.append((round, course))
+    if errors:
+        raise SyncError(errors)
+    if created:
+        db.session.flush()
+        for round, course in created:
+            round.add_defaultscores(Hole.query.filter_by(holecourse_id=course.id).order_by(Hole.holenum.asc()).all())
+
+    rounds = []
+    for entry in entries:
+        rounds.append(byid[entry['round']] if entry['round'] is not None else byclient[entry['client_id']])
+    existing = {}
+    roundids = [round.id for round in rounds]
+    if roundids:
+        for roundscore in Roundscore.query.filter(Roundscore.round_id.in_(roundids)):
+            existing[(roundscore.round_id, roundscore.hole)] = roundscore
+
+    createdrounds = set(round for round, course in created)
+    results = []
+    for entry, round in zip(entries, rounds):
+        layout = get_layout(round.roundcourse_id)
+        result = {'round': round.id, 'client_id': round.client_id, 'created': round in createdrounds, 'applied': 0,
+                  'duplicates': 0, 'superseded': [], 'rejected': []}
+        for change in entry['changes']:
+            if layout.get_par(change['hole']) is None:
+                result['rejected'].append(change['id'])
+                continue
+            roundscore = existing.get((round.id, change['hole']))
+            if roundscore is None:
+                existing[(round.id, change['hole'])] = round.add_holescore(
+                    change['hole'], change['score'], change['ob'], change['id'], change['timestamp'])
+                result['applied'] = result['applied'] + 1
+            elif roundscore.client_id == change['id']:
+                result['duplicates'] = result['duplicates'] + 1
+            elif roundscore.updated is not None and roundscore.updated > change['timestamp']:
+                result['superseded'].append(change['id'])
+            else:
+                round.update_holescore(roundscore, change['score'], change['ob'], change['id'], change['timestamp'])
+                result['applied'] = result['applied'] + 1
+        results.append((round, result))
+    return results
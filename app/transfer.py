@@ -0,0 +1,330 @@
+import csv
+import json
+import uuid
+from datetime import datetime
+from app import db
+from app.models import User, Course, Hole, Round, Roundscore
+from app.sync import parse_timestamp
+
+# Contains bulk import and export of rounds as CSV or JSON Lines. Rows are streamed and written in chunks with
+# multi-row inserts, so memory use does not depend on size of the file.
+#
+# One row is one round:
+#   client_id  optional unique id of the round of at most 36 characters, rows with already imported client_id are skipped.
+#              Rows without client_id get an id derived from user, course, date and scores of the row.
+#   user       username, user must exist
+#   course     course name, course is created when it does not exist
+#   location   location of the course for weather lookups, required when course is created
+#   date       ISO 8601 date of the round, required
+#   weather    optional OpenWeatherMap icon name
+#   scores     score of every hole, space separated in CSV
+#   ob         optional OB flag of every hole, 0/1 space separated in CSV
+#   pars       optional pars of holes, used only when course is created. Default par is 3.
+
+CSV_FIELDS = ['client_id', 'user', 'course', 'location', 'date', 'weather', 'scores', 'ob', 'pars']
+# Namespace for client ids of rows that do not have one, same row always gets same id
+IMPORT_NAMESPACE = uuid.UUID('8a3f0c52-4b1e-4d7a-9a55-0d1c6f2e7b10')
+
+
+class ImportResult(object):
+    """
+    Counts of imported, skipped and rejected rows
+    """
+
+    # only first errors are kept, so that a broken file does not fill the memory
+    maxerrors = 100
+
+    def __init__(self):
+        self.imported = 0
+        self.skipped = 0
+        self.rejected = 0
+        self.errors = []
+
+    def __repr__(self):
+        return '<ImportResult imported={} skipped={} rejected={}>'.format(self.imported, self.skipped, self.rejected)
+
+    def reject(self, number, message):
+        """
+        reject counts row as rejected and keeps the error message
+        """
+        self.rejected = self.rejected + 1
+        if len(self.errors) < self.maxerrors:
+            self.errors.append('row {}: {}'.format(number, message))
+
+
+def read_csv(stream):
+    """
+    read_csv yields rows of CSV file as dictionaries with lists of scores
+    """
+    for row in csv.DictReader(stream):
+        row = dict(row)
+        for field in ('scores', 'ob', 'pars'):
+            value = row.get(field)
+            row[field] = value.split() if value else None
+        yield row
+
+
+def read_jsonl(stream):
+    """
+    read_jsonl yields rows of JSON Lines file
+    """
+    for line in stream:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                yield {'invalid': str(error)}
+
+
+def parse_row(row):
+    """
+    parse_row converts row to dictionary of typed values. Raises ValueError when row is not valid.
+    """
+    if not isinstance(row, dict) or 'invalid' in row:
+        raise ValueError('row is not valid JSON object')
+    scores = [int(score) for score in row.get('scores') or []]
+    if not scores or min(scores) < 1:
+        raise ValueError('scores must be positive integers')
+    obs = [value in (True, 1, '1', 'true', 'True') for value in row.get('ob') or []]
+    if obs and len(obs) != len(scores):
+        raise ValueError('ob must have value for every hole')
+    pars = [int(par) for par in row.get('pars') or []]
+    if pars and len(pars) != len(scores):
+        raise ValueError('pars must have value for every hole')
+    if not row.get('user') or not row.get('course'):
+        raise ValueError('user and course are required')
+    if not row.get('date'):
+        raise ValueError('date is required')
+    date = parse_timestamp(row['date'])
+    client_id = row.get('client_id')
+    if client_id and not (isinstance(client_id, str) and len(client_id) <= 36):
+        raise ValueError('client_id must be at most 36 characters')
+    if not client_id:
+        key = '|'.join([row['user'], row['course'], date.isoformat()] + [str(score) for score in scores])
+        client_id = str(uuid.uuid5(IMPORT_NAMESPACE, key))
+    return {
+        'client_id': client_id,
+        'user': row['user'],
+        'course': row['course'],
+        'location': row.get('location') or '',
+        'date': date,
+        'weather': row.get('weather') or None,
+        'scores': scores,
+        'ob': obs or [False] * len(scores),
+        'pars': pars,
+    }
+
+
+def chunked(rows, size):
+    """
+    chunked yields lists of at most size rows
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Importer(object):
+    """
+    Imports rounds in chunks. Users, courses and their layouts are cached for the duration of the import.
+    """
+
+    def __init__(self, chunksize=1000):
+        self.chunksize = chunksize
+        self.users = {}
+        self.courses = {}
+        self.createdcourses = False
+        self.userids = set()
+        self.courseids = set()
+        self.result = ImportResult()
+
+    def get_users(self, names):
+        """
+        get_users loads ids of users that are not cached yet with one query
+        """
+        missing = [name for name in names if name not in self.users]
+        if missing:
+            for id, username in db.session.query(User.id, User.username).filter(User.username.in_(missing)):
+                self.users[username] = id
+
+    def get_course(self, row):
+        """
+        get_course returns (id, pars) of course of row, and creates the course with holes when it does not exist.
+        Raises ValueError when course does not exist and row has no location for it.
+        """
+        course = self.courses.get(row['course'])
+        if course is not None:
+            return course
+        found = Course.query.filter_by(coursename=row['course']).first()
+        if found is None:
+            if not row['location']:
+                raise ValueError('location is required for new course {}'.format(row['course']))
+            found = Course(coursename=row['course'], courseholes=len(row['scores']), courselocation=row['location'])
+            db.session.add(found)
+            db.session.flush()
+            pars = row['pars'] or [3] * len(row['scores'])
+            db.session.execute(Hole.__table__.insert(), [
+                {'holenum': holenum, 'holepar': par, 'holecourse_id': found.id} for holenum, par in enumerate(pars, 1)])
+            self.createdcourses = True
+        pars = {}
+        for holenum, holepar in db.session.query(Hole.holenum, Hole.holepar).filter(Hole.holecourse_id == found.id):
+            pars[holenum] = holepar
+        course = (found.id, pars)
+        self.courses[row['course']] = course
+        return course
+
+    def import_chunk(self, rows):
+        """
+        import_chunk writes rounds of chunk with one multi-row insert, reads their ids back by client id and writes all scores
+        with another multi-row insert
+        """
+        parsed = []
+        for number, row in rows:
+            try:
+                parsed.append((number, parse_row(row)))
+            except (ValueError, TypeError, KeyError) as error:
+                self.result.reject(number, error)
+        self.get_users(set(row['user'] for number, row in parsed))
+        client_ids = [row['client_id'] for number, row in parsed]
+        existing = set(client_id for (client_id,) in
+                       db.session.query(Round.client_id).filter(Round.client_id.in_(client_ids)))
+        now = datetime.utcnow()
+        roundrows = []
+        scorerows = {}
+        for number, row in parsed:
+            if row['client_id'] in existing:
+                self.result.skipped = self.result.skipped + 1
+                continue
+            userid = self.users.get(row['user'])
+            if userid is None:
+                self.result.reject(number, 'user {} not found'.format(row['user']))
+                continue
+            try:
+                courseid, pars = self.get_course(row)
+            except ValueError as error:
+                self.result.reject(number, error)
+                continue
+            if len(row['scores']) != len(pars):
+                self.result.reject(number, 'course {} has {} holes'.format(row['course'], len(pars)))
+                continue
+            existing.add(row['client_id'])
+            self.userids.add(userid)
+            self.courseids.add(courseid)
+            roundrows.append({
+                'rounddate': row['date'], 'roundweather': row['weather'], 'rounduser_id': userid, 'roundcourse_id': courseid,
+                'totalscore': sum(row['scores']), 'totalpar': sum(pars.values()), 'totalob': sum(row['ob']),
+                'version': 1, 'modified': now, 'client_id': row['client_id'],
+            })
+            scorerows[row['client_id']] = row
+        if not roundrows:
+            db.session.commit()
+            return
+        db.session.execute(Round.__table__.insert(), roundrows)
+        ids = db.session.query(Round.id, Round.client_id).filter(Round.client_id.in_(list(scorerows)))
+        holerows = []
+        for roundid, client_id in ids:
+            row = scorerows[client_id]
+            for holenum, (score, ob) in enumerate(zip(row['scores'], row['ob']), 1):
+                holerows.append({'hole': holenum, 'score': score, 'ob': ob, 'round_id': roundid, 'updated': now})
+        db.session.execute(Roundscore.__table__.insert(), holerows)
+        db.session.commit()
+        self.result.imported = self.result.imported + len(roundrows)
+
+    def run(self, rows):
+        """
+        run imports rows and returns ImportResult
+        """
+        for chunk in chunked(enumerate(rows, 1), self.chunksize):
+            self.import_chunk(chunk)
+        if self.createdcourses:
+            from app.choices import course_choices
+            course_choices.invalidate()
+        if self.userids:
+            from app.rating import recompute_ratings
+            recompute_ratings(self.userids)
+        if self.courseids:
+            from app.leaderboard import refresh_leaderboards
+            refresh_leaderboards(self.courseids)
+        return self.result
+
+
+def import_rounds(stream, format, chunksize=1000):
+    """
+    import_rounds imports rounds from CSV or JSON Lines stream and returns ImportResult
+    """
+    rows = read_csv(stream) if format == 'csv' else read_jsonl(stream)
+    return Importer(chunksize).run(rows)
+
+
+def iter_rounds(chunksize=1000):
+    """
+    iter_rounds yields every round as dictionary. Rounds are read in chunks by id and scores of a chunk are read with one query.
+    Pars of holes are read once per course, so that courses can be created with the same layout on import. Holes without
+    par are exported with the default par 3.
+    """
+    lastid = 0
+    coursepars = {}
+    while True:
+        rounds = db.session.query(Round.id, Round.client_id, User.username, Course.coursename, Course.courselocation,
+                                  Round.rounddate, Round.roundweather, Round.roundcourse_id) \
+            .join(User, User.id == Round.rounduser_id) \
+            .join(Course, Course.id == Round.roundcourse_id) \
+            .filter(Round.id > lastid) \
+            .order_by(Round.id.asc()) \
+            .limit(chunksize) \
+            .all()
+        if not rounds:
+            return
+        courseids = set(round[7] for round in rounds) - set(coursepars)
+        if courseids:
+            for courseid in courseids:
+                coursepars[courseid] = []
+            for courseid, holepar in db.session.query(Hole.holecourse_id, db.func.coalesce(Hole.holepar, 3)) \
+                    .filter(Hole.holecourse_id.in_(courseids)) \
+                    .order_by(Hole.holecourse_id, Hole.holenum):
+                coursepars[courseid].append(holepar)
+        scores = {}
+        for roundid, score, ob in db.session.query(Roundscore.round_id, Roundscore.score, Roundscore.ob) \
+                .filter(Roundscore.round_id.in_([round[0] for round in rounds])) \
+                .order_by(Roundscore.round_id, Roundscore.hole):
+            scores.setdefault(roundid, []).append((score, bool(ob)))
+        for roundid, client_id, username, coursename, courselocation, rounddate, roundweather, courseid in rounds:
+            holes = scores.get(roundid, [])
+            yield {
+                'client_id': client_id,
+                'user': username,
+                'course': coursename,
+                'location': courselocation,
+                'date': rounddate.isoformat() if rounddate else None,
+                'weather': roundweather,
+                'scores': [score for score, ob in holes],
+                'ob': [ob for score, ob in holes],
+                'pars': coursepars[courseid],
+            }
+        lastid = rounds[-1][0]
+
+
+def export_rounds(stream, format, chunksize=1000):
+    """
+    export_rounds writes every round to stream as CSV or JSON Lines. Returns number of exported rounds.
+    """
+    count = 0
+    if format == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+    for round in iter_rounds(chunksize):
+        if format == 'csv':
+            round['scores'] = ' '.join(str(score) for score in round['scores'])
+            round['ob'] = ' '.join('1' if ob else '0' for ob in round['ob'])
+            round['pars'] = ' '.join(str(par) for par in round['pars'])
+            writer.writerow(round)
+        else:
+            stream.write(json.dumps(round) + '\n')
+        count = count + 1
+    return count
@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Contains weather lookups for rounds. Lookups are cached per location and can be done in background threads,
+# so that a slow or unavailable OpenWeatherMap does not block creating rounds.
+
+logger = logging.getLogger(__name__)
+
+# Icon that is stored when weather could not be retrieved
+WEATHER_UNKNOWN = 'unknown'
+
+
+class WeatherProvider(object):
+    """
+    Base class for weather providers. Provider returns OpenWeatherMap icon name for a location.
+    """
+
+    def get_icon(self, location):
+        """
+        get_icon returns weather icon name for location or raises an exception
+        """
+        raise NotImplementedError
+
+
+class OWMProvider(WeatherProvider):
+    """
+    Weather provider that uses OpenWeatherMap through pyowm
+    """
+
+    def __init__(self, key, timeout):
+        from pyowm.owm import OWM
+        from pyowm.utils.config import get_default_config
+
+        config = get_default_config()
+        config['connection']['timeout_secs'] = timeout
+        self.manager = OWM(key, config).weather_manager()
+
+    def get_icon(self, location):
+        """
+        get_icon retrieves current weather of location from OpenWeatherMap
+        """
+        observation = self.manager.weather_at_place(location)
+        return observation.weather.weather_icon_name
+
+
+class FakeWeatherProvider(WeatherProvider):
+    """
+    Weather provider for tests and benchmarks. Returns same icon for every location without network access.
+    """
+
+    def __init__(self, icon='01d', delay=0):
+        self.icon = icon
+        self.delay = delay
+        self.lookups = 0
+
+    def get_icon(self, location):
+        """
+        get_icon returns the configured icon after the configured delay
+        """
+        self.lookups = self.lookups + 1
+        if self.delay:
+            time.sleep(self.delay)
+        return self.icon
+
+
+def create_provider(config):
+    """
+    create_provider creates weather provider that is selected with WEATHER_PROVIDER in config
+    """
+    name = config.get('WEATHER_PROVIDER', 'owm')
+    if name == 'fake':
+        return FakeWeatherProvider(delay=config.get('WEATHER_FAKE_DELAY', 0))
+    if name == 'owm':
+        return OWMProvider(config.get('OWM_KEY'), config.get('WEATHER_TIMEOUT', 2))
+    raise ValueError('Unknown weather provider {}'.format(name))
+
+
+class Weather(object):
+    """
+    Weather lookups with per-location cache, timeout fallback and optional background workers.
+    Works like other Flask extensions, create with app or call init_app later.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.provider = None
+        self.ttl = 600
+        self.failurettl = 60
+        self.asynchronous = False
+        self.workers = 2
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        init_app reads weather settings from app config
+        """
+        self.app = app
+        self.ttl = app.config.get('WEATHER_CACHE_TTL', 600)
+        self.failurettl = app.config.get('WEATHER_FAILURE_TTL', 60)
+        self.asynchronous = app.config.get('WEATHER_ASYNC', False)
+        self.workers = app.config.get('WEATHER_WORKERS', 2)
+
+    def get_provider(self):
+        """
+        get_provider returns weather provider. Provider is created on first use so that importing app does not need OWM key.
+        """
+        if self.provider is None:
+            self.provider = create_provider(self.app.config)
+        return self.provider
+
+    def get_cached_icon(self, location):
+        """
+        get_cached_icon returns icon of location from cache or None if it is not cached or cache has expired
+        """
+        with self._lock:
+            entry = self._cache.get(location)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def get_icon(self, location):
+        """
+        get_icon returns icon of location from cache or from provider. Returns WEATHER_UNKNOWN if provider fails.
+        Failures are cached for shorter time, so that an outage does not make every request wait for timeout.
+        Courses without location are not looked up.
+        """
+        if not location:
+            return WEATHER_UNKNOWN
+        icon = self.get_cached_icon(location)
+        if icon is not None:
+            return icon
+        try:
+            icon = self.get_provider().get_icon(location)
+            ttl = self.ttl
+        except Exception:
+            logger.warning('Weather lookup failed for %s', location, exc_info=True)
+            icon = WEATHER_UNKNOWN
+            ttl = self.failurettl
+        with self._lock:
+            self._cache[location] = (time.monotonic() + ttl, icon)
+        return icon
+
+    def clear(self):
+        """
+        clear empties the cache
+        """
+        with self._lock:
+            self._cache.clear()
+
+    def fill_round(self, roundid, location):
+        """
+        fill_round retrieves weather in background thread and stores it to the Round. Returns Future of the lookup.
+        """
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='weather')
+        return self._executor.submit(self._fill_round, roundid, location)
+
+    def _fill_round(self, roundid, location):
+        """
+        _fill_round is run in worker thread. Stores weather icon of location to Round with given id. Version and
+        modification time of the Round are updated in the same statement, so that cached pages of the Round are renewed.
+        """
+        from app import db
+        from app.models import Round
+
+        icon = self.get_icon(location)
+        with self.app.app_context():
+            try:
+                Round.query.filter_by(id=roundid).update({
+                    Round.roundweather: icon,
+                    Round.version: db.func.coalesce(Round.version, 0) + 1,
+                    Round.modified: datetime.utcnow(),
+                }, synchronize_session=False)
+                db.session.commit()
+            finally:
+                db.session.remove()
+        return icon
@@ -0,0 +1,144 @@
+import os
+import tempfile
+import time
+
+# Contains helpers shared by benchmarks. Benchmarks are run from the repository root, for example
+# python -m bench.roundcreation
+# Benchmarks use their own SQLite database unless BENCH_DATABASE_URL is set.
+
+basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+
+def _migrate(url):
+    """
+    _migrate creates schema of the database by running migrations with a minimal app, so that the real app can be imported against a ready database
+    """
+    from flask import Flask
+    from flask_sqlalchemy import SQLAlchemy
+    from flask_migrate import Migrate, upgrade
+
+    migrationapp = Flask(__name__)
+    migrationapp.config['SQLALCHEMY_DATABASE_URI'] = url
+    migrationapp.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    migrationdb = SQLAlchemy(migrationapp)
+    directory = os.path.join(basedir, 'migrations')
+    Migrate(migrationapp, migrationdb, directory=directory)
+    with migrationapp.app_context():
+        upgrade(directory=directory)
+
+
+def create_benchapp():
+    """
+    create_benchapp points the app to the benchmark database, creates the schema and returns app and db
+    """
+    url = os.environ.get('BENCH_DATABASE_URL')
+    if url is None:
+        directory = tempfile.mkdtemp(prefix='caddybook-bench-')
+        url = 'sqlite:///' + os.path.join(directory, 'bench.db')
+    os.environ['DATABASE_URL'] = url
+    os.environ.setdefault('WEATHER_PROVIDER', 'fake')
+    _migrate(url)
+    from app import app, db
+    app.config['WTF_CSRF_ENABLED'] = False
+    return app, db
+
+
+def login_client(app, username, password='bench'):
+    """
+    login_client registers user if needed and returns Flask test client that is logged in as the user
+    """
+    client = app.test_client()
+    client.post('/register', data={'username': username, 'email': username + '@example.com', 'password': password})
+    client.post('/login', data={'username': username, 'password': password})
+    return client
+
+
+def percentile(values, percent):
+    """
+    percentile returns given percentile of values using nearest rank
+    """
+    values = sorted(values)
+    if not values:
+        return None
+    index = max(int(round(percent / 100.0 * len(values))) - 1, 0)
+    return values[index]
+
+
+def timed(function, *args):
+    """
+    timed calls function and returns elapsed time in milliseconds
+    """
+    start = time.perf_counter()
+    function(*args)
+    return (time.perf_counter() - start) * 1000.0
+
+
+class QueryCounter(object):
+    """
+    Counts SQL statements sent to the database of the app
+    """
+
+    def __init__(self, app, db):
+        from sqlalchemy import event
+
+        self.count = 0
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self._execute)
+
+    def _execute(self, *args):
+        self.count = self.count + 1
+
+    def reset(self):
+        """
+        reset sets count to zero and returns the previous count
+        """
+        count = self.count
+        self.count = 0
+        return count
+
+
+def summarize(times, queries=None):
+    """
+    summarize returns mean, p50 and p95 of times in milliseconds and mean of queries for results files
+    """
+    summary = {
+        'count': len(times),
+        'mean_ms': round(sum(times) / len(times), 3) if times else None,
+        'p50_ms': round(percentile(times, 50), 3) if times else None,
+        'p95_ms': round(percentile(times, 95), 3) if times else None,
+    }
+    if queries is not None:
+        summary['queries'] = round(sum(queries) / float(len(queries)), 2) if queries else None
+    return summary
+
+
+def git_commit():
+    """
+    git_commit returns hash of the checked out commit, or None outside of a git repository
+    """
+    import subprocess
+
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=basedir, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path, benchmark, parameters, results):
+    """
+    write_results writes results of a benchmark to JSON file, so that runs of different commits can be compared
+    """
+    import json
+    from datetime import datetime
+
+    data = {
+        'benchmark': benchmark,
+        'commit': git_commit(),
+        'created': datetime.utcnow().isoformat(),
+        'database': os.environ.get('DATABASE_URL', '').split(':', 1)[0],
+        'parameters': parameters,
+        'results': results,
+    }
+    with open(path, 'w') as stream:
+        json.dump(data, stream, indent=2)
+    print('Results written to {}'.format(path))
@@ -0,0 +1,76 @@
+import argparse
+import time
+
+from bench import create_benchapp, write_results, summarize, timed
+from bench.generate import generate
+
+# Benchmark for hole difficulty analytics. Generates one course with --rounds rounds and reports time of loading the
+# score matrix without cache, loading it from cache after one round has changed, and of calculating statistics from it.
+# get_courseanalytics is timed after one round has changed, like on a page view after a new score, and after
+# warm_cache, like on the first page view of a course in a gunicorn worker that has warmed the cache at start.
+# Default size is about one million score rows.
+# Run with python -m bench.analytics --output results.json
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hole difficulty analytics latency')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=60000)
+    parser.add_argument('--seed', type=int, default=2021)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='JSON file for results')
+    args = parser.parse_args()
+
+    app, db = create_benchapp()
+    from app.models import Course, Round
+    from app.analytics import load_scorematrix, analyze, get_courseanalytics, matrix_cache, warm_cache
+
+    with app.test_request_context():
+        counts = generate(db, args.users, 1, args.rounds, args.seed)
+        print(', '.join('{} {}'.format(count, name) for name, count in counts.items()))
+        course = Course.query.first()
+        userid = db.session.query(Round.rounduser_id).filter(Round.roundcourse_id == course.id).first()[0]
+        roundids = [roundid for roundid, in db.session.query(Round.id).filter(Round.roundcourse_id == course.id).limit(args.repeat)]
+
+        cold = []
+        changed = []
+        analyses = []
+        totals = []
+        warms = []
+        warmed = []
+        for i in range(args.repeat):
+            matrix_cache.clear()
+            start = time.perf_counter()
+            load_scorematrix(course.id)
+            cold.append((time.perf_counter() - start) * 1000.0)
+            # a new score touches one round, the next page view reads scores of that round only
+            Round.query.get(roundids[i]).touch()
+            db.session.commit()
+            start = time.perf_counter()
+            matrix = load_scorematrix(course.id)
+            loaded = time.perf_counter()
+            analyze(matrix)
+            analyses.append((time.perf_counter() - loaded) * 1000.0)
+            changed.append((loaded - start) * 1000.0)
+            Round.query.get(roundids[i]).touch()
+            db.session.commit()
+            start = time.perf_counter()
+            get_courseanalytics(course.id, userid)
+            totals.append((time.perf_counter() - start) * 1000.0)
+            matrix_cache.clear()
+            warms.append(timed(warm_cache))
+            warmed.append(timed(get_courseanalytics, course.id, userid))
+
+    results = {'load_scorematrix': summarize(cold), 'load_scorematrix_changed': summarize(changed), 'analyze': summarize(analyses),
+               'get_courseanalytics': summarize(totals), 'warm_cache': summarize(warms),
+               'get_courseanalytics_warmed': summarize(warmed)}
+    print('{} rounds x {} holes'.format(len(matrix), len(matrix.holenums)))
+    print('{:<26} {:>10} {:>10}'.format('step', 'p50 ms', 'p95 ms'))
+    for name, result in results.items():
+        print('{:<26} {:>10.1f} {:>10.1f}'.format(name, result['p50_ms'], result['p95_ms']))
+    if args.output:
+        write_results(args.output, 'analytics', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
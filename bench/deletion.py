@@ -0,0 +1,54 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from bench import create_benchapp, write_results
+from bench.generate import generate
+
+# Benchmark for deleting rounds. Compares the old way of deleting every Roundscore and Round with the ORM to
+# delete_rounds, which is one DELETE statement with scores removed by ON DELETE CASCADE.
+# Run with python -m bench.deletion --rounds 10000
+
+
+def delete_perrow(db, Round, Roundscore, roundids):
+    """
+    delete_perrow deletes rounds like the delete route did before, one ORM delete per score and round
+    """
+    for roundid in roundids:
+        round = Round.query.filter_by(id=roundid).first()
+        for score in Roundscore.query.filter_by(round_id=roundid):
+            db.session.delete(score)
+        db.session.delete(round)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Round deletion time')
+    parser.add_argument('--rounds', type=int, default=10000, help='rounds deleted per method')
+    parser.add_argument('--output', help='JSON file for results')
+    args = parser.parse_args()
+
+    app, db = create_benchapp()
+    from app.models import Round, Roundscore, delete_rounds
+
+    results = {}
+    with app.app_context():
+        for name in ('per-row', 'set-based'):
+            generate(db, 10, 5, args.rounds, prefix=name.replace('-', ''))
+            roundids = [id for (id,) in db.session.query(Round.id)]
+            scores = Roundscore.query.count()
+            start = time.perf_counter()
+            if name == 'per-row':
+                delete_perrow(db, Round, Roundscore, roundids)
+            else:
+                delete_rounds(before=datetime.utcnow() + timedelta(days=1))
+            elapsed = time.perf_counter() - start
+            assert Round.query.count() == 0 and Roundscore.query.count() == 0
+            results[name] = {'rounds': len(roundids), 'roundscores': scores, 'seconds': round(elapsed, 3)}
+            print('{:>10} {:>8} rounds {:>8} scores {:>10.2f} s'.format(name, len(roundids), scores, elapsed))
+    if args.output:
+        write_results(args.output, 'deletion', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
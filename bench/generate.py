@@ -0,0 +1,106 @@
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from bench import create_benchapp
+
+# Synthetic data generator for benchmarks. Fills the benchmark database with users, courses of 9 to 27 holes,
+# rounds and their scores using multi-row inserts. Every user can log in with password "bench".
+# Run with python -m bench.generate, other benchmarks call generate() directly.
+
+PASSWORD = 'bench'
+CHUNKSIZE = 1000
+
+
+def insert_chunked(db, table, rows):
+    """
+    insert_chunked inserts rows with one executemany per chunk and returns number of rows
+    """
+    for start in range(0, len(rows), CHUNKSIZE):
+        db.session.execute(table.insert(), rows[start:start + CHUNKSIZE])
+    return len(rows)
+
+
+def generate(db, users=10, courses=20, rounds=1000, seed=2021, prefix='bench'):
+    """
+    generate creates users, courses with holes and rounds with scores. Rounds are spread over users and courses and
+    over the last two years. Returns dictionary of created row counts.
+    """
+    from werkzeug.security import generate_password_hash
+    from app.models import User, Course, Hole, Round, Roundscore
+
+    random.seed(seed)
+    passwordhash = generate_password_hash(PASSWORD)
+    insert_chunked(db, User.__table__, [
+        {'username': '{}user{}'.format(prefix, i), 'email': '{}user{}@example.com'.format(prefix, i), 'password_hash': passwordhash}
+        for i in range(users)])
+    courserows = []
+    for i in range(courses):
+        courserows.append({'coursename': '{}course{}'.format(prefix, i), 'courseholes': random.choice((9, 12, 18, 21, 24, 27)),
+                           'courselocation': 'Helsinki', 'version': 1, 'modified': datetime.utcnow()})
+    insert_chunked(db, Course.__table__, courserows)
+
+    userids = [id for (id,) in db.session.query(User.id).filter(User.username.like(prefix + 'user%'))]
+    layouts = {}
+    holerows = []
+    for id, courseholes in db.session.query(Course.id, Course.courseholes).filter(Course.coursename.like(prefix + 'course%')):
+        layouts[id] = [random.choice((3, 3, 3, 4, 4, 5)) for holenum in range(courseholes)]
+        for holenum, holepar in enumerate(layouts[id], 1):
+            holerows.append({'holenum': holenum, 'holepar': holepar, 'holelength': random.randint(50, 250), 'holecourse_id': id})
+    insert_chunked(db, Hole.__table__, holerows)
+
+    # rounds get client ids, so that their ids can be read back and scores inserted in the same chunk
+    start = datetime.utcnow() - timedelta(days=730)
+    roundrows = []
+    scores = {}
+    for i in range(rounds):
+        courseid = random.choice(list(layouts))
+        pars = layouts[courseid]
+        holescores = [max(1, par + random.choice((-1, 0, 0, 0, 1, 1, 2))) for par in pars]
+        obs = [random.random() < 0.05 for par in pars]
+        client_id = '{}-{}-{}'.format(prefix, seed, i)
+        roundrows.append({
+            'rounddate': start + timedelta(minutes=random.randint(0, 730 * 24 * 60)), 'roundweather': random.choice(('01d', '04d', '10d')),
+            'rounduser_id': random.choice(userids), 'roundcourse_id': courseid, 'totalscore': sum(holescores), 'totalpar': sum(pars),
+            'totalob': sum(obs), 'version': 1, 'modified': datetime.utcnow(), 'client_id': client_id,
+        })
+        scores[client_id] = (holescores, obs)
+    scorecount = 0
+    for chunkstart in range(0, len(roundrows), CHUNKSIZE):
+        chunk = roundrows[chunkstart:chunkstart + CHUNKSIZE]
+        db.session.execute(Round.__table__.insert(), chunk)
+        scorerows = []
+        for roundid, client_id in db.session.query(Round.id, Round.client_id) \
+                .filter(Round.client_id.in_([row['client_id'] for row in chunk])):
+            holescores, obs = scores[client_id]
+            for holenum, (score, ob) in enumerate(zip(holescores, obs), 1):
+                scorerows.append({'hole': holenum, 'score': score, 'ob': ob, 'round_id': roundid})
+        scorecount = scorecount + insert_chunked(db, Roundscore.__table__, scorerows)
+    db.session.commit()
+    return {'users': users, 'courses': courses, 'holes': len(holerows), 'rounds': rounds, 'roundscores': scorecount}
+
+
+def add_arguments(parser):
+    """
+    add_arguments adds data size options shared by benchmarks that generate data
+    """
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--courses', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=2021)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fill benchmark database with synthetic data')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    app, db = create_benchapp()
+    with app.app_context():
+        counts = generate(db, args.users, args.courses, args.rounds, args.seed)
+        print(', '.join('{} {}'.format(count, name) for name, count in counts.items()))
+        print('Database: {}'.format(app.config['SQLALCHEMY_DATABASE_URI']))
+
+
+if __name__ == '__main__':
+    main()
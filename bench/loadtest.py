@@ -0,0 +1,109 @@
+import argparse
+import random
+import time
+
+from bench import create_benchapp, write_results, summarize, QueryCounter
+from bench.generate import generate, add_arguments, PASSWORD
+
+# Load test over the main routes with the Flask test client. A generated user logs in and requests a random mix of
+# index, analyzecourse, roundview, createround and roundscores pages. Latency and queries of every request are
+# reported per route. With --cold the page cache is cleared before every request.
+# Run with python -m bench.loadtest --output results.json
+
+
+class UserData(object):
+    """
+    Rounds and courses of the user that requests are made for
+    """
+
+    def __init__(self, db, userid):
+        from app.models import Course, Round
+
+        self.holecounts = {}
+        self.coursenames = set()
+        for roundid, coursename, courseholes in db.session.query(Round.id, Course.coursename, Course.courseholes) \
+                .join(Course, Course.id == Round.roundcourse_id) \
+                .filter(Round.rounduser_id == userid):
+            self.holecounts[roundid] = courseholes
+            self.coursenames.add(coursename)
+        self.roundids = list(self.holecounts)
+        self.coursenames = sorted(self.coursenames)
+        self.courseids = [id for (id,) in db.session.query(Course.id)]
+
+
+def route_requests(client, data):
+    """
+    route_requests returns (route, function) pairs. Every function makes one request and returns the response.
+    """
+
+    def roundscores(method):
+        def request():
+            roundid = random.choice(data.roundids)
+            url = '/roundscores/{}/{}'.format(roundid, random.randint(1, data.holecounts[roundid]))
+            if method == 'POST':
+                return client.post(url, data={'score': random.randint(2, 6)})
+            return client.get(url)
+        return request
+
+    return [
+        ('index', lambda: client.get('/index')),
+        ('analyzecourse', lambda: client.get('/analyzecourse/' + random.choice(data.coursenames))),
+        ('roundview', lambda: client.get('/roundview/{}'.format(random.choice(data.roundids)))),
+        ('createround GET', lambda: client.get('/createround')),
+        ('createround POST', lambda: client.post('/createround', data={'course': random.choice(data.courseids)})),
+        ('roundscores GET', roundscores('GET')),
+        ('roundscores POST', roundscores('POST')),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency and queries per request of the main routes')
+    add_arguments(parser)
+    parser.add_argument('--requests', type=int, default=1000, help='requests in total, spread evenly over routes')
+    parser.add_argument('--cold', action='store_true', help='clear page cache before every request')
+    parser.add_argument('--output', help='JSON file for results')
+    args = parser.parse_args()
+
+    app, db = create_benchapp()
+    from app.httpcache import fragment_cache
+    from app.models import User
+
+    with app.app_context():
+        generate(db, args.users, args.courses, args.rounds, args.seed)
+        user = User.query.order_by(User.id.asc()).first()
+        username = user.username
+        data = UserData(db, user.id)
+    client = app.test_client()
+    client.post('/login', data={'username': username, 'password': PASSWORD})
+
+    counter = QueryCounter(app, db)
+    routes = route_requests(client, data)
+    times = dict((route, []) for route, request in routes)
+    queries = dict((route, []) for route, request in routes)
+    errors = dict((route, 0) for route, request in routes)
+    random.seed(args.seed)
+    for i in range(args.requests):
+        route, request = routes[i % len(routes)]
+        if args.cold:
+            fragment_cache.clear()
+        counter.reset()
+        start = time.perf_counter()
+        response = request()
+        times[route].append((time.perf_counter() - start) * 1000.0)
+        queries[route].append(counter.reset())
+        if response.status_code >= 400:
+            errors[route] = errors[route] + 1
+
+    results = {}
+    print('{:<18} {:>10} {:>10} {:>10} {:>8}'.format('route', 'p50 ms', 'p95 ms', 'queries', 'errors'))
+    for route, request in routes:
+        results[route] = summarize(times[route], queries[route])
+        results[route]['errors'] = errors[route]
+        print('{:<18} {:>10.2f} {:>10.2f} {:>10.1f} {:>8}'.format(route, results[route]['p50_ms'], results[route]['p95_ms'],
+                                                               results[route]['queries'], errors[route]))
+    if args.output:
+        write_results(args.output, 'loadtest', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import threading
+import time
+
+from bench import create_benchapp, write_results, summarize
+from bench.generate import generate, PASSWORD
+
+# Login storm benchmark. --concurrency threads log in generated users at the same time with the Flask test client,
+# like everyone logging in when a league night starts. Reports logins per second and login latency. Compare
+# PASSWORD_WORKERS=0, which hashes in request threads, to the process pool.
+# Run with python -m bench.loginstorm --concurrency 50 --output results.json
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Login throughput with concurrent users')
+    parser.add_argument('--concurrency', type=int, default=50, help='users logging in at the same time')
+    parser.add_argument('--logins', type=int, default=4, help='logins per user')
+    parser.add_argument('--output', help='JSON file for results')
+    args = parser.parse_args()
+
+    app, db = create_benchapp()
+    from app import passwords
+
+    with app.app_context():
+        generate(db, users=args.concurrency, courses=1, rounds=0)
+    times = []
+    failures = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.concurrency + 1)
+
+    def user(number):
+        client = app.test_client()
+        barrier.wait()
+        for i in range(args.logins):
+            start = time.perf_counter()
+            response = client.post('/login', data={'username': 'benchuser{}'.format(number), 'password': PASSWORD})
+            elapsed = (time.perf_counter() - start) * 1000.0
+            client.get('/logout')
+            with lock:
+                times.append(elapsed)
+                if response.status_code != 302 or '/login' in response.headers.get('Location', ''):
+                    failures.append(number)
+
+    threads = [threading.Thread(target=user, args=(number,)) for number in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    results = summarize(times)
+    results['logins_per_second'] = round(len(times) / elapsed, 2)
+    results['failures'] = len(failures)
+    print('{} workers, {} concurrent users: {} logins in {:.2f} s, {:.1f} logins/s, p50 {:.1f} ms, p95 {:.1f} ms, {} failed'.format(
+        passwords.workers or 'no', args.concurrency, len(times), elapsed, results['logins_per_second'], results['p50_ms'],
+        results['p95_ms'], len(failures)))
+    if args.output:
+        parameters = dict(vars(args), workers=passwords.workers, method=passwords.method)
+        write_results(args.output, 'loginstorm', parameters, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+import argparse
+
+from bench import create_benchapp, write_results, summarize, QueryCounter
+from bench.generate import generate, add_arguments
+
+# Micro-benchmarks for the model helpers in app/models.py. Every helper is called --repeat times on generated data and
+# time and queries of one call are reported. Course layout cache is cleared before every call, like at the start of
+# a request. Helpers that change data are flushed and rolled back after the measured call.
+# Run with python -m bench.modelhelpers --output results.json
+
+
+def helper_benchmarks(db, user, course, round):
+    """
+    helper_benchmarks returns (name, function, changes) tuples for every model helper. changes tells if the helper changes data.
+    """
+    from app.models import Course, Hole, Round, Roundscore, get_coursesversion
+
+    hole = course.get_holes().filter(Hole.holenum == 1).first()
+    score = Roundscore.query.filter_by(round_id=round.id, hole=1).first()
+    holes = course.get_holes().order_by(Hole.holenum.asc()).all()
+
+    def flushed(function):
+        def run():
+            function()
+            db.session.flush()
+        return run
+
+    def totals():
+        round.totalscore = None
+        round.get_totalscore()
+
+    def newround():
+        new = Round(rounduser_id=user.id, roundcourse_id=course.id)
+        db.session.add(new)
+        db.session.flush()
+        new.add_defaultscores(holes)
+
+    def newcourse():
+        new = Course(coursename='benchhelpers', courseholes=18, courselocation='Helsinki')
+        db.session.add(new)
+        db.session.flush()
+        new.add_holes()
+
+    return [
+        ('User.get_rounds', lambda: user.get_rounds().limit(5).all(), False),
+        ('User.set_password', flushed(lambda: user.set_password('bench')), True),
+        ('User.check_password', lambda: user.check_password('bench'), False),
+        ('Course.get_holes', lambda: course.get_holes().all(), False),
+        ('Course.get_coursepar', lambda: course.get_coursepar(), False),
+        ('Course.get_layout', lambda: course.get_layout(), False),
+        ('Course.get_rounds', lambda: course.get_rounds(user.id).limit(5).all(), False),
+        ('Course.get_roundsversion', lambda: course.get_roundsversion(user.id), False),
+        ('Course.get_holemean', lambda: course.get_holemean(user.id, 1), False),
+        ('Course.get_roundmean', lambda: course.get_roundmean(user.id), False),
+        ('Course.add_holes', flushed(newcourse), True),
+        ('Course.touch', flushed(lambda: course.touch()), True),
+        ('Course.set_holepar', flushed(lambda: course.set_holepar(hole, hole.holepar + 1)), True),
+        ('Round.get_coursename', lambda: round.get_coursename(), False),
+        ('Round.get_date', lambda: round.get_date(), False),
+        ('Round.get_scores', lambda: round.get_scores().all(), False),
+        ('Round.get_totalscore', lambda: round.get_totalscore(), False),
+        ('Round.get_totalscorepar', lambda: round.get_totalscorepar(), False),
+        ('Round.update_totals', flushed(totals), True),
+        ('Round.add_defaultscores', flushed(newround), True),
+        ('Round.add_holescore', flushed(lambda: round.add_holescore(len(holes) + 1, 3, False)), True),
+        ('Round.update_holescore', flushed(lambda: round.update_holescore(score, score.score + 1, not score.ob)), True),
+        ('Round.get_scorecard', lambda: round.get_scorecard(), False),
+        ('Round.get_holescore', lambda: round.get_holescore(1), False),
+        ('Round.get_weatherurl', lambda: round.get_weatherurl(), False),
+        ('Round.touch', flushed(lambda: round.touch()), True),
+        ('Roundscore.get_par', lambda: score.get_par(course.id), False),
+        ('get_coursesversion', get_coursesversion, False),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time and queries of model helpers')
+    add_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=200, help='calls per helper')
+    parser.add_argument('--output', help='JSON file for results')
+    args = parser.parse_args()
+
+    app, db = create_benchapp()
+    from flask import g
+    from app.models import User, Course, Round
+    import time
+
+    counter = QueryCounter(app, db)
+    with app.test_request_context():
+        generate(db, args.users, args.courses, args.rounds, args.seed)
+        # measure with the user and course that have the most rounds
+        userid, courseid, count = db.session.query(Round.rounduser_id, Round.roundcourse_id, db.func.count(Round.id)) \
+            .group_by(Round.rounduser_id, Round.roundcourse_id) \
+            .order_by(db.func.count(Round.id).desc()) \
+            .first()
+        user = User.query.get(userid)
+        course = Course.query.get(courseid)
+        round = course.get_rounds(userid).first()
+
+        results = {}
+        print('{:<26} {:>10} {:>10} {:>10}'.format('helper', 'p50 ms', 'p95 ms', 'queries'))
+        for name, function, changes in helper_benchmarks(db, user, course, round):
+            times = []
+            queries = []
+            objects = list(db.session.identity_map.values())
+            for i in range(args.repeat):
+                g.pop('courselayouts', None)
+                counter.reset()
+                start = time.perf_counter()
+                function()
+                times.append((time.perf_counter() - start) * 1000.0)
+                queries.append(counter.reset())
+                if changes:
+                    # rollback expires loaded objects, load them again so that next call starts from the same state
+                    db.session.rollback()
+                    for instance in objects:
+                        db.session.refresh(instance)
+                    counter.reset()
+            results[name] = summarize(times, queries)
+            print('{:<26} {:>10.3f} {:>10.3f} {:>10.1f}'.format(name, results[name]['p50_ms'], results[name]['p95_ms'],
+                                                             results[name]['queries']))
+    if args.output:
+        write_results(args.output, 'modelhelpers', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
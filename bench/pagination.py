@@ -0,0 +1,58 @@
+import argparse
+from datetime import datetime, timedelta
+
+from bench import create_benchapp, timed
+
+# Benchmark for round history pages. Compares OFFSET pagination with keyset pagination
+# on pages 1 to --pages of one user.
+
+
+def create_rounds(db, Round, userid, courseid, count):
+    """
+    create_rounds inserts count rounds for the user with one executemany, one round per day
+    """
+    start = datetime(2020, 1, 1)
+    rows = []
+    for i in range(count):
+        rows.append({'rounddate': start + timedelta(days=i), 'roundweather': '01d', 'rounduser_id': userid,
+                     'roundcourse_id': courseid, 'totalscore': 54, 'totalpar': 54, 'totalob': 0})
+    db.session.execute(Round.__table__.insert(), rows)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Round history page latency')
+    parser.add_argument('--pages', type=int, default=500, help='deepest page')
+    parser.add_argument('--per-page', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=20, help='requests per measured page')
+    args = parser.parse_args()
+
+    app, db = create_benchapp()
+    from app.models import User, Course, Round
+    from app.pagination import keyset_paginate
+
+    with app.app_context():
+        user = User(username='bench', email='bench@example.com')
+        course = Course(coursename='bench', courseholes=18, courselocation='Helsinki')
+        db.session.add_all([user, course])
+        db.session.commit()
+        create_rounds(db, Round, user.id, course.id, args.pages * args.per_page)
+
+        # walk through pages once to collect the cursor of every page
+        cursors = [None]
+        page = keyset_paginate(user.get_rounds(), args.per_page)
+        while page.has_next and len(cursors) < args.pages:
+            cursors.append(page.next_cursor)
+            page = keyset_paginate(user.get_rounds(), args.per_page, after=page.next_cursor)
+
+        measured = sorted(set(p for p in (1, 10, 50, 100, 250, args.pages) if p <= len(cursors)))
+        print('{:>6} {:>12} {:>12}'.format('page', 'offset ms', 'keyset ms'))
+        for number in measured:
+            offset = [timed(lambda: user.get_rounds().paginate(number, args.per_page, False).items) for i in range(args.repeat)]
+            keyset = [timed(lambda: keyset_paginate(user.get_rounds(), args.per_page, after=cursors[number - 1]).items)
+                      for i in range(args.repeat)]
+            print('{:>6} {:>12.3f} {:>12.3f}'.format(number, sum(offset) / len(offset), sum(keyset) / len(keyset)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+import re
+import sys
+
+from bench import create_benchapp
+
+# Query plan check for model helpers. Every statement a helper runs is explained on the benchmark database
+# (SQLite or Postgres, see BENCH_DATABASE_URL) and the check fails if a plan scans a whole table, except tables
+# a helper reads completely by design, like round in backfill_roundtotals.
+# Run with python -m bench.queryplans, exit status is 1 when a full scan is found.
+
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+def create_data(db):
+    """
+    create_data creates few users, courses and rounds so that every helper has something to read
+    """
+    from app.models import User, Course, Hole, Round
+
+    users = [User(username='plan{}'.format(i), email='plan{}@example.com'.format(i)) for i in range(3)]
+    db.session.add_all(users)
+    courses = []
+    for i, holecount in enumerate((9, 18)):
+        course = Course(coursename='plancourse{}'.format(i), courseholes=holecount, courselocation='Helsinki')
+        db.session.add(course)
+        db.session.flush()
+        course.add_holes()
+        courses.append(course)
+    db.session.flush()
+    for user in users:
+        for course in courses:
+            for i in range(3):
+                round = Round(rounduser_id=user.id, roundcourse_id=course.id)
+                db.session.add(round)
+                db.session.flush()
+                round.add_defaultscores(course.get_holes().order_by(Hole.holenum.asc()).all())
+    db.session.commit()
+    return users[0], courses[1]
+
+
+def helper_checks(db, user, course):
+    """
+    helper_checks returns (name, function, allowed) tuples for model helpers in app/models.py and the statistics helpers
+    built on them. allowed are tables the helper may scan completely. Layout cache is cleared before helpers that read
+    the layout, so that its query is explained. delete_rounds is last, because it deletes a round.
+    """
+    from app.models import Round, Hole, get_coursesversion, backfill_roundtotals, delete_rounds
+    from app.layout import invalidate_layout
+    from app.stats import get_coursestats
+
+    round = course.get_rounds(user.id).first()
+    score = round.get_scores().first()
+    hole = course.get_holes().filter(Hole.holenum == 1).first()
+
+    def uncached_totals():
+        round.totalscore = None
+        round.get_totalscore()
+        db.session.rollback()
+
+    def set_holepar():
+        course.set_holepar(hole, hole.holepar + 1)
+        db.session.rollback()
+
+    def uncached(function):
+        def run():
+            invalidate_layout(course.id)
+            return function()
+        return run
+
+    return [
+        ('User.get_rounds', lambda: user.get_rounds().limit(5).all(), ()),
+        ('Course.get_holes', lambda: course.get_holes().all(), ()),
+        ('Course.get_coursepar', uncached(course.get_coursepar), ()),
+        ('Course.get_rounds', lambda: course.get_rounds(user.id).limit(5).all(), ()),
+        ('Course.get_roundsversion', lambda: course.get_roundsversion(user.id), ()),
+        ('Course.get_roundsversion of all users', lambda: course.get_roundsversion(), ()),
+        ('Course.get_holemean', lambda: course.get_holemean(user.id, 1), ()),
+        ('Course.get_roundmean', lambda: course.get_roundmean(user.id), ()),
+        ('Course.set_holepar', set_holepar, ()),
+        ('Round.get_coursename', lambda: Round.query.get(round.id).get_coursename(), ()),
+        ('Round.get_scores', lambda: round.get_scores().all(), ()),
+        ('Round.get_totalscore', uncached_totals, ()),
+        ('Round.get_scorecard', lambda: round.get_scorecard(), ()),
+        ('Round.get_holescore', lambda: round.get_holescore(1), ()),
+        ('Roundscore.get_par', uncached(lambda: score.get_par(course.id)), ()),
+        ('get_coursestats', lambda: get_coursestats(course.id, user.id), ()),
+        ('get_coursesversion', get_coursesversion, ('course',)),
+        ('backfill_roundtotals', backfill_roundtotals, ('round',)),
+        ('delete_rounds', lambda: delete_rounds(roundids=[round.id]), ()),
+    ]
+
+
+def explain(connection, dialect, statement, parameters):
+    """
+    explain returns plan lines of statement
+    """
+    cursor = connection.cursor()
+    try:
+        if dialect == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute('EXPLAIN ' + statement, parameters)
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def full_scans(dialect, plan, tables):
+    """
+    full_scans returns names of tables that plan reads completely. Scans of subquery results are allowed.
+    """
+    pattern = SQLITE_SCAN if dialect == 'sqlite' else POSTGRES_SCAN
+    scanned = []
+    for line in plan:
+        match = pattern.search(line)
+        if match is None:
+            continue
+        name = re.sub(r'_\d+$', '', match.group(1))
+        if name in tables:
+            scanned.append(match.group(1))
+    return scanned
+
+
+def check(db, function, allowed=()):
+    """
+    check runs function and explains every statement it runs. Returns number of statements and
+    (statement, plan, scanned tables) of statements that scan a whole table other than allowed tables.
+    """
+    from sqlalchemy import event
+
+    dialect = db.engine.dialect.name
+    tables = set(db.metadata.tables) - set(allowed)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().split(None, 1)[0].upper() in ('SELECT', 'UPDATE', 'DELETE'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        function()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    failures = []
+    connection = db.engine.raw_connection()
+    try:
+        if dialect == 'postgresql':
+            cursor = connection.cursor()
+            cursor.execute('SET enable_seqscan = off')
+            cursor.close()
+        for statement, parameters in statements:
+            plan = explain(connection, dialect, statement, parameters)
+            scanned = full_scans(dialect, plan, tables)
+            if scanned:
+                failures.append((statement, plan, scanned))
+    finally:
+        connection.close()
+    return len(statements), failures
+
+
+def main():
+    app, db = create_benchapp()
+
+    with app.app_context():
+        user, course = create_data(db)
+        failures = 0
+        for name, function, allowed in helper_checks(db, user, course):
+            count, failed = check(db, function, allowed)
+            for statement, plan, scanned in failed:
+                print('FAIL {}: full scan of {}'.format(name, ', '.join(scanned)))
+                print('    ' + ' '.join(statement.split()))
+                for line in plan:
+                    print('    | ' + line)
+            if failed:
+                failures = failures + 1
+            else:
+                print('ok   {} ({} statements)'.format(name, count))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
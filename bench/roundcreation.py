@@ -0,0 +1,58 @@
+import argparse
+
+from bench import create_benchapp, percentile, timed
+
+# Benchmark for creating rounds. Compares the old way of committing every Roundscore separately
+# to the bulk insert that is used by createround.
+
+
+def create_round_perrow(db, Round, Roundscore, course, holes, userid):
+    """
+    create_round_perrow creates round like createround did before bulk inserts, one commit per hole
+    """
+    round = Round(rounduser_id=userid, roundcourse_id=course.id)
+    db.session.add(round)
+    db.session.commit()
+    for hole in holes:
+        db.session.add(Roundscore(hole=hole.holenum, score=hole.holepar, ob=False, round_id=round.id))
+        db.session.commit()
+
+
+def create_round_bulk(db, Round, Roundscore, course, holes, userid):
+    """
+    create_round_bulk creates round the way createround does, one insert for scores and one commit
+    """
+    round = Round(rounduser_id=userid, roundcourse_id=course.id)
+    db.session.add(round)
+    db.session.flush()
+    round.add_defaultscores(holes)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Round creation latency')
+    parser.add_argument('--rounds', type=int, default=200, help='rounds created per course and method')
+    args = parser.parse_args()
+
+    app, db = create_benchapp()
+    from app.models import User, Course, Hole, Round, Roundscore
+
+    with app.app_context():
+        user = User(username='bench', email='bench@example.com')
+        db.session.add(user)
+        db.session.commit()
+        print('{:>6} {:>10} {:>10} {:>10}'.format('holes', 'method', 'p50 ms', 'p95 ms'))
+        for holecount in (9, 18, 27):
+            course = Course(coursename='bench{}'.format(holecount), courseholes=holecount, courselocation='Helsinki')
+            db.session.add(course)
+            db.session.flush()
+            course.add_holes()
+            db.session.commit()
+            holes = course.get_holes().order_by(Hole.holenum.asc()).all()
+            for name, function in (('per-row', create_round_perrow), ('bulk', create_round_bulk)):
+                times = [timed(function, db, Round, Roundscore, course, holes, user.id) for i in range(args.rounds)]
+                print('{:>6} {:>10} {:>10.2f} {:>10.2f}'.format(holecount, name, percentile(times, 50), percentile(times, 95)))
+
+
+if __name__ == '__main__':
+    main()
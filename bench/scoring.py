@@ -0,0 +1,67 @@
+import argparse
+import random
+import time
+
+from bench import create_benchapp, login_client, percentile
+
+# Load test for entering scores of a round. Compares the hole by hole form flow of roundscores,
+# one POST and one redirected GET per hole, with one batch request to the JSON API.
+
+
+def form_flow(client, roundid, scores):
+    """
+    form_flow enters scores like a browser does, posting form of every hole and following the redirect
+    """
+    requests = 0
+    for hole, score in enumerate(scores, 1):
+        client.post('/roundscores/{}/{}'.format(roundid, hole), data={'score': score})
+        client.get('/roundscores/{}/{}'.format(roundid, hole + 1))
+        requests = requests + 2
+    return requests
+
+
+def api_flow(client, roundid, scores):
+    """
+    api_flow enters all scores with one JSON request
+    """
+    batch = [{'hole': hole, 'score': score, 'ob': False} for hole, score in enumerate(scores, 1)]
+    response = client.post('/api/rounds/{}/scores'.format(roundid), json={'scores': batch})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score entry server time per round')
+    parser.add_argument('--rounds', type=int, default=50, help='rounds entered per flow')
+    parser.add_argument('--holes', type=int, default=18)
+    args = parser.parse_args()
+
+    app, db = create_benchapp()
+    from app.models import Round
+    from sqlalchemy import event
+
+    queries = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *a: queries.append(1))
+    client = login_client(app, 'bench')
+    client.post('/createcourse', data={'coursename': 'bench', 'courseholes': args.holes, 'courselocation': 'Helsinki'})
+
+    print('{:>6} {:>10} {:>12} {:>12} {:>12}'.format('flow', 'requests', 'queries', 'p50 ms', 'p95 ms'))
+    for name, flow in (('form', form_flow), ('api', api_flow)):
+        times = []
+        requestcount = 0
+        del queries[:]
+        for i in range(args.rounds):
+            client.post('/createround', data={'course': 1})
+            with app.app_context():
+                roundid = db.session.query(db.func.max(Round.id)).scalar()
+            scores = [random.randint(2, 6) for hole in range(args.holes)]
+            start = time.perf_counter()
+            requestcount = flow(client, roundid, scores)
+            times.append((time.perf_counter() - start) * 1000.0)
+        print('{:>6} {:>10} {:>12.1f} {:>12.2f} {:>12.2f}'.format(name, requestcount, len(queries) / float(args.rounds),
+                                                               percentile(times, 50), percentile(times, 95)))
+
+
+if __name__ == '__main__':
+    main()
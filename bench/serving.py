@@ -0,0 +1,149 @@
+import argparse
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import build_opener, HTTPCookieProcessor
+
+from bench import basedir, create_benchapp, write_results, summarize
+from bench.generate import generate, PASSWORD
+
+# Load test of serving modes. Starts gunicorn with gunicorn.conf.py once per worker class against the benchmark
+# database, and --clients users request index and start rounds over HTTP at the same time. Weather lookups wait
+# --weather-delay seconds to simulate slow OpenWeatherMap, which is where sync workers block.
+# Run with python -m bench.serving --output results.json
+
+
+CSRF_TOKEN = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+
+
+def csrf_token(opener, url):
+    """
+    csrf_token reads CSRF token of the form on page, forms of the served app are protected like in production
+    """
+    html = opener.open(url).read().decode('utf-8')
+    return CSRF_TOKEN.search(html).group(1)
+
+
+def wait_for_port(port, process, timeout=30):
+    """
+    wait_for_port waits until gunicorn accepts connections. Fails when gunicorn exits before that.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('gunicorn exited with status {}'.format(process.returncode))
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn did not start on port {}'.format(port))
+
+
+def start_server(mode, port, args):
+    """
+    start_server starts gunicorn with worker class mode and returns the process. gunicorn is run with the Python of
+    the benchmark, gunicorn 20.0 can not be run with python -m gunicorn.
+    """
+    # gunicorn runs sync workers that have more than one thread as gthread workers
+    threads = 1 if mode == 'sync' else args.threads
+    env = dict(os.environ, WEB_WORKER_CLASS=mode, WEB_CONCURRENCY=str(args.workers), WEB_THREADS=str(threads),
+               WEATHER_PROVIDER='fake', WEATHER_FAKE_DELAY=str(args.weather_delay), WEATHER_CACHE_TTL='0')
+    return subprocess.Popen([sys.executable, '-m', 'gunicorn.app.wsgiapp', '-c', 'gunicorn.conf.py', '--bind', '127.0.0.1:{}'.format(port),
+                             'app:app'], cwd=basedir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def run_clients(port, args, courseid):
+    """
+    run_clients logs in --clients users and makes requests for --duration seconds. Returns latencies by route and errors.
+    """
+    base = 'http://127.0.0.1:{}'.format(port)
+    times = {'index': [], 'createround': []}
+    errors = [0]
+    lock = threading.Lock()
+    deadline = []
+    barrier = threading.Barrier(args.clients + 1)
+
+    def client(number):
+        opener = build_opener(HTTPCookieProcessor(CookieJar()))
+        token = csrf_token(opener, base + '/login')
+        opener.open(base + '/login', urlencode({'username': 'benchuser{}'.format(number), 'password': PASSWORD,
+                                                'csrf_token': token}).encode()).read()
+        form = urlencode({'course': courseid, 'csrf_token': csrf_token(opener, base + '/createround')}).encode()
+        barrier.wait()
+        requests = 0
+        while time.monotonic() < deadline[0]:
+            route = 'createround' if requests % 4 == 3 else 'index'
+            start = time.perf_counter()
+            try:
+                if route == 'createround':
+                    opener.open(base + '/createround', form, timeout=60).read()
+                else:
+                    opener.open(base + '/index', timeout=60).read()
+                elapsed = (time.perf_counter() - start) * 1000.0
+                with lock:
+                    times[route].append(elapsed)
+            except (HTTPError, OSError):
+                with lock:
+                    errors[0] = errors[0] + 1
+            requests = requests + 1
+
+    threads = [threading.Thread(target=client, args=(number,)) for number in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    deadline.append(time.monotonic() + args.duration)
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+    return times, errors[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput of gunicorn worker classes')
+    parser.add_argument('--modes', default='sync,gthread', help='comma separated gunicorn worker classes')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--clients', type=int, default=32, help='concurrent users')
+    parser.add_argument('--duration', type=float, default=20, help='seconds per mode')
+    parser.add_argument('--weather-delay', type=float, default=0.5, help='seconds per weather lookup')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--output', help='JSON file for results')
+    args = parser.parse_args()
+
+    app, db = create_benchapp()
+    from app.models import Course
+
+    with app.app_context():
+        generate(db, users=args.clients, courses=5, rounds=20 * args.clients)
+        courseid = Course.query.first().id
+
+    results = {}
+    print('{:<10} {:>12} {:>14} {:>14} {:>8}'.format('mode', 'requests/s', 'index p95 ms', 'round p95 ms', 'errors'))
+    for mode in args.modes.split(','):
+        process = start_server(mode, args.port, args)
+        try:
+            wait_for_port(args.port, process)
+            times, errors = run_clients(args.port, args, courseid)
+        finally:
+            process.terminate()
+            process.wait()
+        count = sum(len(values) for values in times.values())
+        results[mode] = dict((route, summarize(values)) for route, values in times.items())
+        results[mode]['requests_per_second'] = round(count / args.duration, 2)
+        results[mode]['errors'] = errors
+        print('{:<10} {:>12.1f} {:>14} {:>14} {:>8}'.format(mode, results[mode]['requests_per_second'],
+                                                            results[mode]['index']['p95_ms'], results[mode]['createround']['p95_ms'],
+                                                            errors))
+    if args.output:
+        write_results(args.output, 'serving', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,4 +7,60 @@ class Config(object):
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    OWM_KEY = os.environ.get("OWM_KEY")
\ No newline at end of file
+    # Concurrent requests per web worker, see gunicorn.conf.py
+    WEB_THREADS = int(os.environ.get('WEB_THREADS') or 8)
+    # Connection pool of every worker process. Pool has a connection for every request thread by default, and
+    # background weather threads can borrow overflow connections.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or WEB_THREADS)
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW') or os.environ.get('WEATHER_WORKERS') or 2)
+    # Seconds to wait for a free connection before failing the request
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT') or 10)
+    # Seconds after which connections are replaced, and whether connections are tested before use, so that
+    # connections closed by a database restart are not handed to requests
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE') or 1800)
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+    # Milliseconds a Postgres statement may run, empty for no limit
+    DB_STATEMENT_TIMEOUT = int(os.environ.get('DB_STATEMENT_TIMEOUT') or 0) or None
+    # SQLite database of development uses write-ahead log, and waits this many milliseconds for a locked database
+    SQLITE_WAL = os.environ.get('SQLITE_WAL', 'true').lower() in ('1', 'true', 'yes')
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT') or 5000)
+    OWM_KEY = os.environ.get("OWM_KEY")
+    # 'owm' uses OpenWeatherMap, 'fake' returns same icon without network access
+    WEATHER_PROVIDER = os.environ.get('WEATHER_PROVIDER') or 'owm'
+    # Seconds fake provider waits per lookup, to simulate slow OpenWeatherMap in load tests
+    WEATHER_FAKE_DELAY = float(os.environ.get('WEATHER_FAKE_DELAY') or 0)
+    WEATHER_TIMEOUT = float(os.environ.get('WEATHER_TIMEOUT') or 2)
+    WEATHER_CACHE_TTL = int(os.environ.get('WEATHER_CACHE_TTL') or 600)
+    WEATHER_FAILURE_TTL = int(os.environ.get('WEATHER_FAILURE_TTL') or 60)
+    # Store weather to rounds from background threads instead of waiting for it in createround
+    WEATHER_ASYNC = os.environ.get('WEATHER_ASYNC', '').lower() in ('1', 'true', 'yes')
+    WEATHER_WORKERS = int(os.environ.get('WEATHER_WORKERS') or 2)
+    # Seconds course choices of createround are cached, new courses of other worker processes show up after this
+    COURSE_CHOICES_TTL = int(os.environ.get('COURSE_CHOICES_TTL') or 60)
+    # Size limits of in-process cache of rendered pages
+    PAGE_CACHE_ENTRIES = int(os.environ.get('PAGE_CACHE_ENTRIES') or 512)
+    PAGE_CACHE_BYTES = int(os.environ.get('PAGE_CACHE_BYTES') or 16 * 1024 * 1024)
+    # Number of courses whose score matrix is kept in memory for hole difficulty analytics
+    ANALYTICS_CACHE_COURSES = int(os.environ.get('ANALYTICS_CACHE_COURSES') or 8)
+    # Load score matrices of the most played courses when a gunicorn worker starts
+    ANALYTICS_WARM = os.environ.get('ANALYTICS_WARM', 'true').lower() in ('1', 'true', 'yes')
+    # Per-request query counting and timing, sent in Server-Timing header and shown to PERF_ADMINS in /debug/perf
+    PERF_ENABLED = os.environ.get('PERF_ENABLED', '').lower() in ('1', 'true', 'yes')
+    # user ids, because users can change their usernames
+    PERF_ADMINS = [int(userid) for userid in (os.environ.get('PERF_ADMINS') or '').split(',') if userid.strip()]
+    PERF_SLOWEST = int(os.environ.get('PERF_SLOWEST') or 5)
+    # Number of latest rounds of a user on a course the rating is calculated from
+    RATING_ROUNDS = int(os.environ.get('RATING_ROUNDS') or 10)
+    # Werkzeug hash method of new passwords, for example pbkdf2:sha256:260000. Old hashes are replaced at login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'pbkdf2:sha256:150000'
+    PASSWORD_SALT_LENGTH = int(os.environ.get('PASSWORD_SALT_LENGTH') or 8)
+    # Processes that calculate password hashes, 0 hashes in the request thread
+    PASSWORD_WORKERS = int(os.environ.get('PASSWORD_WORKERS') or 2)
+    # Seconds and number of users the logged in user is cached, so that requests do not read the user from database
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL') or 60)
+    IDENTITY_CACHE_ENTRIES = int(os.environ.get('IDENTITY_CACHE_ENTRIES') or 1024)
+    # Optional read replica. Read-only pages and marked model helpers read from it, and users read from the primary
+    # for REPLICA_LAG seconds after they have written
+    REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL')
+    SQLALCHEMY_BINDS = {'replica': REPLICA_DATABASE_URL} if REPLICA_DATABASE_URL else None
+    REPLICA_LAG = int(os.environ.get('REPLICA_LAG') or 5)
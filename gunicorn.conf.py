@@ -0,0 +1,31 @@
+import os
+
+# Gunicorn settings. Workers are threaded by default, so a slow OpenWeatherMap or database call blocks one thread
+# instead of a whole worker. Every setting can be changed with environment variables:
+# WEB_CONCURRENCY worker processes, WEB_THREADS concurrent requests per worker and WEB_WORKER_CLASS gthread, sync
+# or gevent. gevent needs the gevent and psycogreen packages. Database pool of every worker is sized from WEB_THREADS
+# in config.py unless DB_POOL_SIZE is set, so requests of a worker do not wait for a connection.
+
+worker_class = os.environ.get('WEB_WORKER_CLASS') or 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY') or 2)
+threads = int(os.environ.get('WEB_THREADS') or 8)
+worker_connections = threads
+timeout = int(os.environ.get('WEB_TIMEOUT') or 30)
+keepalive = 5
+
+
+def post_fork(server, worker):
+    """
+    post_fork makes psycopg2 cooperative when gevent workers are used, otherwise a query blocks every greenlet of the worker
+    """
+    if worker_class == 'gevent':
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+
+def post_worker_init(worker):
+    """
+    post_worker_init starts loading score matrices of the most played courses in the background, see ANALYTICS_WARM
+    """
+    from app.analytics import start_warming
+    start_warming()
@@ -0,0 +1,32 @@
+"""round score cascade
+
+Revision ID: 1a9e4c7f2d60
+Revises: f58d0c2e7b16
+Create Date: 2026-10-17 18:12:37.604113
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '1a9e4c7f2d60'
+down_revision = 'f58d0c2e7b16'
+branch_labels = None
+depends_on = None
+
+# Foreign key of round_hole was created without a name. This gives it the name Postgres uses, so that SQLite batch mode
+# can find it when the table is recreated.
+naming_convention = {'fk': '%(table_name)s_%(column_0_name)s_fkey'}
+
+
+def upgrade():
+    op.execute('DELETE FROM round_hole WHERE round_id IS NOT NULL AND round_id NOT IN (SELECT id FROM round)')
+    with op.batch_alter_table('round_hole', naming_convention=naming_convention) as batch_op:
+        batch_op.drop_constraint('round_hole_round_id_fkey', type_='foreignkey')
+        batch_op.create_foreign_key('round_hole_round_id_fkey', 'round', ['round_id'], ['id'], ondelete='CASCADE')
+
+
+def downgrade():
+    with op.batch_alter_table('round_hole', naming_convention=naming_convention) as batch_op:
+        batch_op.drop_constraint('round_hole_round_id_fkey', type_='foreignkey')
+        batch_op.create_foreign_key('round_hole_round_id_fkey', 'round', ['round_id'], ['id'])
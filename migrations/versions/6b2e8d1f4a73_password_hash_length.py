@@ -0,0 +1,26 @@
+"""password hash length
+
+Revision ID: 6b2e8d1f4a73
+Revises: 1a9e4c7f2d60
+Create Date: 2026-10-17 21:05:11.482906
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6b2e8d1f4a73'
+down_revision = '1a9e4c7f2d60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.alter_column('password_hash', existing_type=sa.String(length=128), type_=sa.String(length=256))
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.alter_column('password_hash', existing_type=sa.String(length=256), type_=sa.String(length=128))
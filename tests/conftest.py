@@ -0,0 +1,109 @@
+import os
+import tempfile
+import pytest
+from sqlalchemy import event
+
+# Tests run against a SQLite database in a temporary directory. The schema is created with the migrations by the
+# benchmark helpers, so tests see the same indexes as production. Rows and in-process caches are removed after every test.
+# Fixtures do not keep an application context open, because requests of the test client would then share flask.g.
+
+# DATABASE_URL is set before test modules import the app
+os.environ['BENCH_DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='caddybook-test-'), 'test.db')
+os.environ['DATABASE_URL'] = os.environ['BENCH_DATABASE_URL']
+os.environ['WEATHER_PROVIDER'] = 'fake'
+os.environ['PASSWORD_WORKERS'] = '0'
+
+
+class QueryCounter(object):
+    """
+    Counts SQL statements sent to the database while it is used as context manager
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _execute(self, *args):
+        self.count = self.count + 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, 'before_cursor_execute', self._execute)
+        return self
+
+    def __exit__(self, *args):
+        event.remove(self.engine, 'before_cursor_execute', self._execute)
+
+
+@pytest.fixture(scope='session')
+def app():
+    from bench import create_benchapp
+
+    app, db = create_benchapp()
+    return app
+
+
+@pytest.fixture
+def db(app):
+    from app import db
+    from app.httpcache import fragment_cache
+    from app.identity import identity_cache
+    from app.analytics import matrix_cache
+    from app.choices import course_choices
+
+    yield db
+    with app.app_context():
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+    fragment_cache.clear()
+    identity_cache.clear()
+    matrix_cache.clear()
+    course_choices.invalidate()
+
+
+@pytest.fixture
+def queries(app, db):
+    """
+    queries counts statements of the app database, use as with queries: ...
+    """
+    return QueryCounter(db.get_engine(app))
+
+
+@pytest.fixture
+def player(app, db):
+    """
+    player creates a user and a 9 hole course and returns test client logged in as the user, user id and course id
+    """
+    from bench import login_client
+    from app.models import User, Course
+
+    client = login_client(app, 'player')
+    with app.app_context():
+        course = Course(coursename='Oittaa', courseholes=9, courselocation='Espoo')
+        db.session.add(course)
+        db.session.flush()
+        course.add_holes()
+        db.session.commit()
+        return client, User.query.filter_by(username='player').first().id, course.id
+
+
+@pytest.fixture
+def add_rounds(app, db):
+    """
+    add_rounds creates count rounds of par scores for user on course and returns id of the last one
+    """
+    from app.models import Course, Hole, Round
+
+    def add(userid, courseid, count):
+        with app.app_context():
+            holes = Course.query.get(courseid).get_holes().order_by(Hole.holenum.asc()).all()
+            for i in range(count):
+                round = Round(rounduser_id=userid, roundcourse_id=courseid, roundweather='01d')
+                db.session.add(round)
+                db.session.flush()
+                round.add_defaultscores(holes)
+            db.session.commit()
+            return round.id
+
+    return add
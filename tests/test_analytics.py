@@ -0,0 +1,23 @@
+from app.analytics import load_scorematrix, warm_cache, matrix_cache
+
+
+def test_warm_cache_loads_most_played_courses(app, db, player, add_rounds):
+    client, userid, courseid = player
+    add_rounds(userid, courseid, 3)
+    with app.app_context():
+        assert warm_cache() == [courseid]
+        versions, matrix = matrix_cache.get(courseid)
+        assert matrix.scores.shape == (3, 9)
+        assert (matrix.scores == 3).all()
+
+
+def test_scorematrix_has_scores_and_obs(app, player, add_rounds):
+    client, userid, courseid = player
+    roundid = add_rounds(userid, courseid, 2)
+    client.post('/api/rounds/{}/scores'.format(roundid), json={'scores': [{'hole': 9, 'score': 99, 'ob': True}]})
+    with app.app_context():
+        matrix = load_scorematrix(courseid)
+    assert list(matrix.roundids) == [roundid - 1, roundid]
+    assert list(matrix.scores[1]) == [3] * 8 + [99]
+    assert list(matrix.obs[1]) == [False] * 8 + [True]
+    assert not matrix.obs[0].any()
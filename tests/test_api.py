@@ -0,0 +1,35 @@
+import pytest
+
+
+@pytest.mark.parametrize('entry', [
+    {'hole': [1], 'score': 3},
+    {'hole': {'number': 1}, 'score': 3},
+    {'hole': 1, 'score': 10 ** 12},
+    {'hole': 1, 'score': 0},
+])
+def test_invalid_scores_are_rejected(player, add_rounds, entry):
+    client, userid, courseid = player
+    roundid = add_rounds(userid, courseid, 1)
+    response = client.post('/api/rounds/{}/scores'.format(roundid), json={'scores': [entry]})
+    assert response.status_code == 400
+    assert response.get_json()['errors']
+
+
+def test_scores_are_saved(player, add_rounds):
+    client, userid, courseid = player
+    roundid = add_rounds(userid, courseid, 1)
+    response = client.post('/api/rounds/{}/scores'.format(roundid), json={'scores': [{'hole': 1, 'score': 5}]})
+    assert response.status_code == 200
+    assert response.get_json()['totalscore'] == 29
+
+
+@pytest.mark.parametrize('entry, error', [
+    ({'client_id': 'a', 'course': 1, 'changes': 5}, 'rounds[0]: changes must be a list'),
+    ({'client_id': 'a', 'course': 1, 'changes': 'abc'}, 'rounds[0]: changes must be a list'),
+    ({'client_id': 'a', 'course': True, 'changes': []}, 'rounds[0]: course id is required for new rounds'),
+])
+def test_malformed_sync_batches_are_rejected(player, entry, error):
+    client, userid, courseid = player
+    response = client.post('/api/sync', json={'rounds': [entry]})
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == [error]
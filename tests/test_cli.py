@@ -0,0 +1,15 @@
+from app.models import Round
+
+
+def test_backfill_totals_is_registered_on_package_app(app, db, player, add_rounds):
+    client, userid, courseid = player
+    roundid = add_rounds(userid, courseid, 3)
+    with app.app_context():
+        Round.query.update({Round.totalscore: None, Round.totalpar: None, Round.totalob: None})
+        db.session.commit()
+    result = app.test_cli_runner().invoke(args=['backfill-totals'])
+    assert result.exit_code == 0, result.output
+    assert 'Updated totals of 3 rounds' in result.output
+    with app.app_context():
+        round = Round.query.get(roundid)
+        assert (round.totalscore, round.totalpar, round.totalob) == (27, 27, 0)
@@ -0,0 +1,37 @@
+from app.httpcache import FragmentCache
+from app.models import Round
+
+
+def test_fragment_size_is_counted_in_bytes():
+    cache = FragmentCache(maxentries=10, maxbytes=10)
+    cache.set('a', 'ääää')
+    assert cache.size == 8
+    cache.set('b', 'ää')
+    assert cache.get('a') is None
+    assert cache.get('b') == 'ää'
+    assert cache.size == 4
+
+
+def test_deleted_round_is_not_answered_with_not_modified(player, add_rounds):
+    client, userid, courseid = player
+    roundid = add_rounds(userid, courseid, 2)
+    first = client.get('/analyzecourse/Oittaa')
+    # older round is deleted, so the latest modification time of rounds stays the same
+    client.get('/delete/{}'.format(roundid - 1), follow_redirects=True)
+    second = client.get('/analyzecourse/Oittaa', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert second.status_code == 200
+    assert first.headers['ETag'] != second.headers['ETag']
+
+
+def test_touch_increases_version_in_database(app, db, player, add_rounds):
+    client, userid, courseid = player
+    roundid = add_rounds(userid, courseid, 1)
+    with app.app_context():
+        round = Round.query.get(roundid)
+        version = round.version
+        # another request increases the version after this one has loaded the round
+        db.session.execute(Round.__table__.update().where(Round.__table__.c.id == roundid)
+                           .values(version=Round.__table__.c.version + 1))
+        round.touch()
+        db.session.commit()
+        assert Round.query.get(roundid).version == version + 2
@@ -0,0 +1,19 @@
+import pytest
+from flask import Flask
+from werkzeug.security import generate_password_hash
+from app.passwords import Passwords, hash_length, HASH_LENGTH
+
+
+@pytest.mark.parametrize('method, saltlength', [('pbkdf2:sha256:150000', 8), ('pbkdf2:sha512:150000', 16), ('sha1', 4)])
+def test_hash_length(method, saltlength):
+    assert hash_length(method, saltlength) == len(generate_password_hash('secret', method, saltlength))
+
+
+def test_hashes_must_fit_to_database():
+    passwordapp = Flask(__name__)
+    passwordapp.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha512'
+    passwordapp.config['PASSWORD_SALT_LENGTH'] = 16
+    assert Passwords(passwordapp).method == 'pbkdf2:sha512:150000'
+    passwordapp.config['PASSWORD_SALT_LENGTH'] = HASH_LENGTH
+    with pytest.raises(ValueError):
+        Passwords(passwordapp)
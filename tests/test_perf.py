@@ -0,0 +1,44 @@
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from app.perf import Perf
+
+
+class Visitor(object):
+    is_authenticated = True
+
+    def __init__(self, id, username):
+        self.id = id
+        self.username = username
+
+
+@pytest.fixture
+def perf():
+    perfapp = Flask(__name__)
+    perfapp.config['PERF_ENABLED'] = True
+    perfapp.config['PERF_ADMINS'] = [1]
+    perf = Perf(perfapp)
+    yield perf
+    event.remove(Engine, 'before_cursor_execute', perf._before_execute)
+    event.remove(Engine, 'after_cursor_execute', perf._after_execute)
+    event.remove(Engine, 'handle_error', perf._handle_error)
+
+
+def test_admins_are_user_ids(perf):
+    assert perf.is_admin(Visitor(1, 'someone'))
+    assert not perf.is_admin(Visitor(2, '1'))
+
+
+def test_failed_statement_does_not_leave_start_time(perf):
+    engine = create_engine('sqlite://')
+    with perf.app.test_request_context('/'):
+        perf._before_request()
+        with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute('SELECT * FROM missing')
+            conn.execute('SELECT 1')
+            assert conn.info['perfstart'] == []
+        perf._after_request(perf.app.response_class())
+    assert perf.get_endpoints()[0]['requests'] == 1
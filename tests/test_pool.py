@@ -0,0 +1,9 @@
+from sqlalchemy import create_engine
+
+
+def test_sqlite_pragmas_are_set_only_on_app_engine(app, db):
+    with app.app_context():
+        assert db.session.execute('PRAGMA foreign_keys').scalar() == 1
+        assert db.session.execute('PRAGMA journal_mode').scalar() == 'wal'
+    other = create_engine('sqlite://')
+    assert other.execute('PRAGMA foreign_keys').scalar() == 0
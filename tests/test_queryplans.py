@@ -0,0 +1,12 @@
+from bench.queryplans import create_data, helper_checks, check
+
+
+def test_helpers_do_not_scan_whole_tables(app, db):
+    with app.app_context():
+        user, course = create_data(db)
+        scans = []
+        for name, function, allowed in helper_checks(db, user, course):
+            count, failed = check(db, function, allowed)
+            assert count > 0, name
+            scans.extend('{}: {}'.format(name, ', '.join(scanned)) for statement, plan, scanned in failed)
+        assert scans == []
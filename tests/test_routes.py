@@ -0,0 +1,54 @@
+import pytest
+from app.httpcache import fragment_cache
+from app.analytics import matrix_cache
+
+
+def page_queries(client, queries, url):
+    """
+    page_queries requests url without cached pages and score matrices and returns number of statements it ran
+    """
+    fragment_cache.clear()
+    matrix_cache.clear()
+    with queries:
+        response = client.get(url)
+    assert response.status_code == 200
+    return queries.count
+
+
+@pytest.mark.parametrize('url', [
+    '/index',
+    '/user/player',
+    '/analyzecourse/Oittaa',
+    '/roundview/{roundid}',
+])
+def test_route_queries_do_not_grow_with_rounds(queries, player, add_rounds, url):
+    client, userid, courseid = player
+    roundid = add_rounds(userid, courseid, 2)
+    url = url.format(roundid=roundid)
+    # first request loads the logged in user to the identity cache
+    client.get(url)
+    few = page_queries(client, queries, url)
+    add_rounds(userid, courseid, 40)
+    many = page_queries(client, queries, url)
+    assert few == many
+
+
+def test_cached_pages_do_not_query_rounds(queries, player, add_rounds):
+    client, userid, courseid = player
+    roundid = add_rounds(userid, courseid, 3)
+    for url in ('/analyzecourse/Oittaa', '/roundview/{}'.format(roundid)):
+        uncached = page_queries(client, queries, url)
+        with queries:
+            assert client.get(url).status_code == 200
+        assert queries.count < uncached
+
+
+def test_roundview_of_hole_without_par(app, db, player, add_rounds):
+    from app.models import Hole
+
+    client, userid, courseid = player
+    roundid = add_rounds(userid, courseid, 1)
+    with app.app_context():
+        Hole.query.filter_by(holecourse_id=courseid, holenum=2).update({Hole.holepar: None})
+        db.session.commit()
+    assert client.get('/roundview/{}'.format(roundid)).status_code == 200
@@ -0,0 +1,42 @@
+from app.models import Course
+from app.stats import get_coursestats
+
+
+def coursestats_queries(app, queries, userid, courseid):
+    with app.app_context():
+        with queries:
+            stats = get_coursestats(courseid, userid)
+        return queries.count, stats
+
+
+def test_coursestats(app, player, add_rounds):
+    client, userid, courseid = player
+    add_rounds(userid, courseid, 4)
+    with app.app_context():
+        stats = get_coursestats(courseid, userid)
+    assert stats.roundcount == 4
+    assert stats.coursepar == 27
+    assert stats.roundmean == 27.0
+    assert [hole.mean for hole in stats.holes] == [3.0] * 9
+    assert [hole.variance for hole in stats.holes] == [0.0] * 9
+
+
+def test_coursestats_queries_do_not_grow_with_rounds(app, queries, player, add_rounds):
+    client, userid, courseid = player
+    add_rounds(userid, courseid, 2)
+    few, stats = coursestats_queries(app, queries, userid, courseid)
+    add_rounds(userid, courseid, 30)
+    many, stats = coursestats_queries(app, queries, userid, courseid)
+    assert stats.roundcount == 32
+    assert few == many == 2
+
+
+def test_means_are_single_queries(app, queries, player, add_rounds):
+    client, userid, courseid = player
+    add_rounds(userid, courseid, 12)
+    with app.app_context():
+        course = Course.query.get(courseid)
+        with queries:
+            assert course.get_roundmean(userid) == 27.0
+            assert course.get_holemean(userid, 1) == 3.0
+        assert queries.count == 2
@@ -0,0 +1,44 @@
+import io
+import json
+from app.models import Course, Round
+from app.transfer import import_rounds, export_rounds
+
+
+def jsonl(*rows):
+    return io.StringIO(''.join(json.dumps(row) + '\n' for row in rows))
+
+
+def row(**values):
+    base = {'user': 'player', 'course': 'Oittaa', 'date': '2021-05-01T10:00:00', 'scores': [3] * 9}
+    base.update(values)
+    return base
+
+
+def test_same_file_is_imported_once(app, player):
+    with app.app_context():
+        first = import_rounds(jsonl(row(), row(date='2021-05-02T10:00:00')), 'jsonl')
+        second = import_rounds(jsonl(row(), row(date='2021-05-02T10:00:00')), 'jsonl')
+        assert (first.imported, second.imported, second.skipped) == (2, 0, 2)
+        assert Round.query.count() == 2
+
+
+def test_invalid_rows_are_rejected(app, player):
+    with app.app_context():
+        result = import_rounds(jsonl(row(date=None), row(client_id='x' * 37), row(course='Uusi', scores=[3] * 18)), 'jsonl')
+        assert result.imported == 0
+        assert result.rejected == 3
+        assert 'date is required' in result.errors[0]
+        assert 'client_id' in result.errors[1]
+        assert 'location is required' in result.errors[2]
+
+
+def test_exported_rounds_import_with_course_location(app, player, add_rounds):
+    client, userid, courseid = player
+    add_rounds(userid, courseid, 2)
+    with app.app_context():
+        stream = io.StringIO()
+        assert export_rounds(stream, 'csv') == 2
+        rows = stream.getvalue().replace('Oittaa', 'Kopio')
+        result = import_rounds(io.StringIO(rows), 'csv')
+        assert result.imported == 2, result.errors
+        assert Course.query.filter_by(coursename='Kopio').one().courselocation == 'Espoo'